@@ -1,14 +1,37 @@
+import io
+import mimetypes
 import os
-from datetime import datetime, date
+import secrets
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import hashlib
+import click
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from collections import Counter, namedtuple
+from datetime import datetime, date, timedelta
 from dateutil.relativedelta import relativedelta
-from flask import Flask, render_template, redirect, url_for, request, flash
+from flask import Flask, render_template, stream_template, stream_with_context, redirect, url_for, request, flash, get_flashed_messages, jsonify, abort, Response, has_request_context, send_file, send_from_directory
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only, make_transient_to_detached
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user, UserMixin
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, PasswordField, SubmitField, DecimalField, SelectField
 from wtforms.validators import DataRequired, Length, EqualTo
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash, check_password_hash, safe_join
 from dotenv import load_dotenv
+from assets import DIST_FOLDER, MANIFEST_NAME, VENDOR_ASSETS, build_assets, fetch_vendor_assets, load_manifest
+from cache import LRUCache, create_cache
+from importers import detect_format, parse_csv, parse_ofx, parse_import_row, expense_fingerprint
+from exporters import EXPENSE_FIELDS, RECURRING_FIELDS, iter_csv, iter_jsonl, write_parquet
+from forecast import FORECAST_WINDOW_DAYS, build_forecast
+from instrumentation import init_instrumentation
 
 load_dotenv()
 
@@ -23,12 +46,52 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 instance_path = os.path.join(basedir, 'instance')
 os.makedirs(instance_path, exist_ok=True)
 db_path = os.path.join(instance_path, 'database.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+database_url = os.environ.get('DATABASE_URL') or f'sqlite:///{db_path}'
+if database_url.startswith('postgres://'):
+    database_url = 'postgresql://' + database_url[len('postgres://'):]
+app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+if database_url.startswith('sqlite'):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)) / 1000}}
+else:
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() != 'false',
+    }
+app.config['IMPORT_BATCH_SIZE'] = int(os.environ.get('IMPORT_BATCH_SIZE', 500))
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+app.config['PASSWORD_HASH_WAIT'] = float(os.environ.get('PASSWORD_HASH_WAIT', 5))
+app.config['ADMIN_USERNAMES'] = {name.strip() for name in os.environ.get('ADMIN_USERNAMES', '').split(',') if name.strip()}
 
 db = SQLAlchemy(app)
+
+@db.event.listens_for(db.Engine, 'connect')
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    """Tunes every new SQLite connection for concurrent web workers: WAL journal, relaxed fsync, busy timeout and memory-mapped reads."""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute(f"PRAGMA synchronous={os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')}")
+    cursor.execute(f"PRAGMA busy_timeout={int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))}")
+    cursor.execute(f"PRAGMA mmap_size={int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}")
+    cursor.close()
+# The in-process backend only sees invalidations from its own process. Set CACHE_REDIS_URL when several workers or `flask run-scheduler` write.
+dashboard_cache = create_cache(os.environ.get('CACHE_REDIS_URL'), max_entries=int(os.environ.get('DASHBOARD_CACHE_SIZE', 1024)), ttl=int(os.environ.get('DASHBOARD_CACHE_TTL', 300)))
+dashboard_cache_versions = create_cache(os.environ.get('CACHE_REDIS_URL'), max_entries=int(os.environ.get('DASHBOARD_CACHE_SIZE', 1024)), ttl=int(os.environ.get('DASHBOARD_CACHE_TTL', 300)))
+user_cache = LRUCache(max_entries=int(os.environ.get('USER_CACHE_SIZE', 4096)), ttl=int(os.environ.get('USER_CACHE_TTL', 30)))
+password_hash_workers = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+password_hash_pool = ThreadPoolExecutor(max_workers=password_hash_workers, thread_name_prefix='password-hash')
+password_hash_slots = threading.BoundedSemaphore(password_hash_workers + int(os.environ.get('PASSWORD_HASH_QUEUE', 8)))
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
+if os.environ.get('INSTRUMENT_REQUESTS', 'false').lower() == 'true':
+    init_instrumentation(app, db, repeated_query_threshold=int(os.environ.get('INSTRUMENT_REPEATED_QUERY_THRESHOLD', 5)),
+                         profiler_enabled=os.environ.get('PROFILER_ENABLED', 'false').lower() == 'true',
+                         admin_usernames=app.config['ADMIN_USERNAMES'])
 
 user_achievements = db.Table('user_achievements',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
@@ -42,13 +105,24 @@ class User(UserMixin, db.Model):
     monthly_limit = db.Column(db.Float, default=0)
     saving_goal = db.Column(db.Float, nullable=True)
     expenses = db.relationship('Expense', backref='user', lazy=True, cascade="all, delete-orphan")
-    achievements = db.relationship('Achievement', secondary=user_achievements, lazy='subquery', backref=db.backref('users', lazy=True))
+    expense_rollups = db.relationship('ExpenseRollup', lazy=True, cascade="all, delete-orphan")
+    achievements = db.relationship('Achievement', secondary=user_achievements, lazy='select', backref=db.backref('users', lazy=True))
     recurring_expenses = db.relationship('RecurringExpense', backref='user', lazy=True, cascade="all, delete-orphan")
+    stats = db.relationship('UserStats', uselist=False, lazy=True, cascade="all, delete-orphan")
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = run_password_hash(generate_password_hash, password, method=app.config['PASSWORD_HASH_METHOD'])
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return run_password_hash(check_password_hash, self.password_hash, password)
+
+def run_password_hash(function, *args, **kwargs):
+    """Runs a password KDF on the bounded hashing pool. Callers beyond the pool size plus PASSWORD_HASH_QUEUE wait up to PASSWORD_HASH_WAIT seconds, then get a 503."""
+    if not password_hash_slots.acquire(timeout=app.config['PASSWORD_HASH_WAIT']):
+        abort(503)
+    try:
+        return password_hash_pool.submit(function, *args, **kwargs).result()
+    finally:
+        password_hash_slots.release()
 
 class Expense(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -57,6 +131,28 @@ class Expense(db.Model):
     date = db.Column(db.Date)
     description = db.Column(db.String(100))
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    import_hash = db.Column(db.String(40), nullable=True)
+    is_recurring = db.Column(db.Boolean, nullable=False, default=False, server_default=db.text('false'))
+    __table_args__ = (db.Index('ix_expense_user_category_date', 'user_id', 'category', 'date'), db.Index('ix_expense_user_import_hash', 'user_id', 'import_hash'), db.Index('ix_expense_user_date_forecast', 'user_id', 'date', 'category', 'is_recurring', 'amount'))
+
+class ExpenseRollup(db.Model):
+    """Per-user (year, month, category) running totals kept in step with the Expense table."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    category = db.Column(db.String(150), nullable=False)
+    total = db.Column(db.Float, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (db.UniqueConstraint('user_id', 'year', 'month', 'category', name='uq_expense_rollup_bucket'),)
+
+class UserStats(db.Model):
+    """Per-user bookkeeping: incremental counters for the achievement engine and a data_version bumped by every transaction that changes what the dashboard shows."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    data_version = db.Column(db.Integer, nullable=False, default=0)
+    expense_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    lifetime_spend = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    recurring_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
 class Achievement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -73,6 +169,10 @@ class RecurringExpense(db.Model):
     frequency = db.Column(db.String(20), nullable=False)
     start_date = db.Column(db.Date, nullable=False)
     last_processed_date = db.Column(db.Date, nullable=True)
+    next_due_date = db.Column(db.Date, nullable=True, index=True)
+    __table_args__ = (db.Index('ix_recurring_expense_user_next_due', 'user_id', 'next_due_date'),)
+
+EXPENSE_CATEGORIES = ['Food', 'Transport', 'Housing', 'Subscriptions', 'Entertainment', 'Other']
 
 class RegisterForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(min=3)])
@@ -92,18 +192,15 @@ class ChangePasswordForm(FlaskForm):
 
 class ExpenseForm(FlaskForm):
     amount = DecimalField('Amount', validators=[DataRequired()])
-    category = SelectField('Category', choices=[
-        ('Food', 'Food'),
-        ('Transport', 'Transport'),
-        ('Housing', 'Housing'),
-        ('Subscriptions', 'Subscriptions'),
-        ('Entertainment', 'Entertainment'),
-        ('Other', 'Other')
-    ])
+    category = SelectField('Category', choices=[(category, category) for category in EXPENSE_CATEGORIES])
     date = StringField('Date (YYYY-MM-DD)', validators=[DataRequired()])
     description = StringField('Description')
     submit = SubmitField('Add Expense')
 
+class ImportForm(FlaskForm):
+    file = FileField('Bank export (CSV or OFX)', validators=[FileRequired(), FileAllowed(['csv', 'ofx', 'qfx'], 'Only CSV and OFX files are supported.')])
+    submit = SubmitField('Import')
+
 class BudgetForm(FlaskForm):
     limit = DecimalField('Monthly Budget ($)', validators=[DataRequired()])
     submit = SubmitField('Save')
@@ -114,14 +211,7 @@ class GoalForm(FlaskForm):
 
 class RecurringExpenseForm(FlaskForm):
     amount = DecimalField('Amount', validators=[DataRequired()])
-    category = SelectField('Category', choices=[
-        ('Food', 'Food'),
-        ('Transport', 'Transport'),
-        ('Housing', 'Housing'),
-        ('Subscriptions', 'Subscriptions'),
-        ('Entertainment', 'Entertainment'),
-        ('Other', 'Other')
-    ])
+    category = SelectField('Category', choices=[(category, category) for category in EXPENSE_CATEGORIES])
     description = StringField('Description', validators=[DataRequired()])
     frequency = SelectField('Frequency', choices=[
         ('monthly', 'Monthly'),
@@ -131,44 +221,474 @@ class RecurringExpenseForm(FlaskForm):
     start_date = StringField('Start Date (YYYY-MM-DD)', validators=[DataRequired()])
     submit = SubmitField('Save Recurring Expense')
 
+SESSION_USER_COLUMNS = ('id', 'username', 'monthly_limit', 'saving_goal')
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    """Rebuilds the session user from the per-process user cache, falling back to a query for SESSION_USER_COLUMNS. Other columns load on first access."""
+    user_id = int(user_id)
+    columns = user_cache.get(user_id)
+    if columns is None:
+        user = db.session.get(User, user_id, options=[load_only(*(getattr(User, name) for name in SESSION_USER_COLUMNS))])
+        if user is not None:
+            user_cache.set(user_id, {name: getattr(user, name) for name in SESSION_USER_COLUMNS})
+        return user
+    user = User(**columns)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+def forget_cached_user(user_id):
+    user_cache.delete(user_id)
+
+AchievementRule = namedtuple('AchievementRule', 'name description icon event condition')
+
+ACHIEVEMENT_RULES = [
+    AchievementRule('First Step', 'Added your first expense. Great job!', 'fa-shoe-prints', 'expense', lambda user, stats: stats.expense_count >= 1),
+    AchievementRule('Data Collector', 'Added 10 expenses.', 'fa-layer-group', 'expense', lambda user, stats: stats.expense_count >= 10),
+    AchievementRule('Budget Master', 'Set your first monthly budget!', 'fa-piggy-bank', 'budget', lambda user, stats: bool(user.monthly_limit)),
+    AchievementRule('Goal Achiever', 'Congratulations! You reached your savings goal.', 'fa-bullseye', 'expense', lambda user, stats: bool(user.saving_goal) and user.saving_goal > 0 and stats.lifetime_spend >= user.saving_goal),
+    AchievementRule('Automator', 'Set up your first recurring expense!', 'fa-robot', 'recurring', lambda user, stats: stats.recurring_count >= 1),
+]
+
+_achievement_catalog = {}
+
+def achievement_catalog():
+    """Returns the static Achievement rows keyed by name, loaded from the database once per process."""
+    if not _achievement_catalog:
+        _achievement_catalog.update({a.name: {'id': a.id, 'name': a.name, 'description': a.description, 'icon': a.icon} for a in Achievement.query.all()})
+    return _achievement_catalog
+
+def evaluate_achievements(user, event):
+    """Checks the rules registered for an event against the user's counters and awards the ones newly earned. Costs a constant number of queries."""
+    stats = db.session.get(UserStats, user.id) or UserStats(user_id=user.id, data_version=0, expense_count=0, lifetime_spend=0, recurring_count=0)
+    catalog = achievement_catalog()
+    candidates = {catalog[rule.name]['id']: catalog[rule.name] for rule in ACHIEVEMENT_RULES if rule.event == event and rule.name in catalog and rule.condition(user, stats)}
+    if not candidates:
+        return
+    earned = {achievement_id for (achievement_id,) in db.session.query(user_achievements.c.achievement_id).filter(user_achievements.c.user_id == user.id, user_achievements.c.achievement_id.in_(candidates))}
+    new_achievements = [achievement for achievement_id, achievement in candidates.items() if achievement_id not in earned]
+    if not new_achievements:
+        return
+    new_achievements = [achievement for achievement in new_achievements if insert_if_absent(user_achievements, {'user_id': user.id, 'achievement_id': achievement['id']})]
+    db.session.commit()
+    db.session.expire(user, ['achievements'])
+    if has_request_context():
+        for achievement in new_achievements:
+            flash(f" New Achievement!!|{achievement['name']}|{achievement['description']}|{achievement['icon']}|gold", 'achievement')
+
+def upsert_increments(model, key_names, rows):
+    """Adds the non-key values of each row to the row with the same key_names, creating it if missing. Rows must share their keys. On SQLite and PostgreSQL they go out as one executemany INSERT ... ON CONFLICT, so concurrent writers can't collide."""
+    if not rows:
+        return
+    table = model.__table__
+    increment_names = [name for name in rows[0] if name not in key_names]
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        statement = (sqlite.insert if dialect == 'sqlite' else postgresql.insert)(table)
+        db.session.execute(statement.on_conflict_do_update(index_elements=list(key_names), set_={name: table.c[name] + statement.excluded[name] for name in increment_names}), rows)
+        return
+    for row in rows:
+        result = db.session.execute(db.update(table).where(*(table.c[name] == row[name] for name in key_names)).values(**{name: table.c[name] + row[name] for name in increment_names}))
+        if result.rowcount == 0:
+            db.session.execute(db.insert(table).values(**row))
+
+def insert_if_absent(table, values):
+    """Inserts a row unless one with the same key already exists. Returns True when this call inserted it."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        statement = (sqlite.insert if dialect == 'sqlite' else postgresql.insert)(table).values(**values)
+        return db.session.execute(statement.on_conflict_do_nothing()).rowcount == 1
+    try:
+        with db.session.begin_nested():
+            db.session.execute(db.insert(table).values(**values))
+        return True
+    except IntegrityError:
+        return False
+
+def apply_rollup_delta(user_id, expense_date, category, amount, count=1):
+    """Adds amount/count to the user's (year, month, category) rollup bucket inside the current transaction."""
+    apply_rollup_deltas(user_id, {(expense_date.year, expense_date.month, category): (amount, count)})
+
+def apply_rollup_deltas(user_id, deltas):
+    """Adds each {(year, month, category): (amount, count)} delta to the user's rollup buckets with a single upsert, inside the current transaction. The dashboard entries built from those buckets are invalidated when it commits."""
+    upsert_increments(ExpenseRollup, ('user_id', 'year', 'month', 'category'), [dict(user_id=user_id, year=year, month=month, category=category, total=float(amount), count=count) for (year, month, category), (amount, count) in deltas.items()])
+    if any(count < 0 for _, count in deltas.values()):
+        db.session.execute(db.delete(ExpenseRollup).where(ExpenseRollup.user_id == user_id, ExpenseRollup.count <= 0))
+    mark_user_data_changed(user_id, expense_count=sum(count for _, count in deltas.values()), lifetime_spend=sum(float(amount) for amount, _ in deltas.values()))
+    db.session.info.setdefault('dashboard_buckets', set()).update((user_id, year, month, category) for year, month, category in deltas)
+
+def mark_user_data_changed(user_id, **counter_deltas):
+    """Schedules a bump of the user's data_version, plus any UserStats counter deltas, for when the current transaction commits."""
+    db.session.info.setdefault('stat_deltas', {}).setdefault(user_id, Counter()).update(counter_deltas)
+
+def user_data_version(user_id):
+    stats = db.session.get(UserStats, user_id)
+    return stats.data_version if stats else 0
+
+@db.event.listens_for(db.session, 'before_commit')
+def apply_stat_deltas(session):
+    counters = ('expense_count', 'lifetime_spend', 'recurring_count')
+    upsert_increments(UserStats, ('user_id',), [dict({name: deltas[name] for name in counters}, user_id=user_id, data_version=1) for user_id, deltas in session.info.pop('stat_deltas', {}).items()])
+
+@db.event.listens_for(db.session, 'after_commit')
+def apply_dashboard_invalidations(session):
+    invalidate_dashboard_cache(session.info.pop('dashboard_buckets', ()))
 
-def award_achievement(user, achievement_name):
-    achievement = Achievement.query.filter_by(name=achievement_name).first()
-    if achievement and achievement not in user.achievements:
-        user.achievements.append(achievement); flash(f" New Achievement!!|{achievement.name}|{achievement.description}|{achievement.icon}|gold", 'achievement'); db.session.commit()
+@db.event.listens_for(db.session, 'after_soft_rollback')
+def discard_stat_deltas(session, previous_transaction):
+    session.info.pop('stat_deltas', None)
+    session.info.pop('dashboard_buckets', None)
+
+def dashboard_version_key(user_id, *parts):
+    return ':'.join(['dash-version', str(user_id), *map(str, parts)])
+
+def dashboard_cache_key(user_id, *parts):
+    """Builds the cache key of a dashboard entry from the current version token of (user, *parts). Dropping the token makes entries computed before a write unreachable, even ones stored after it."""
+    version_key = dashboard_version_key(user_id, *parts)
+    version = dashboard_cache_versions.get(version_key)
+    if version is None:
+        version = secrets.token_hex(8)
+        dashboard_cache_versions.set(version_key, version)
+    return ':'.join(['dash', str(user_id), *map(str, parts), version])
+
+def invalidate_dashboard_cache(buckets):
+    """Drops the version tokens of the dashboard entries built from the given (user_id, year, month, category) rollup buckets: the month and all-time category summaries and the year's monthly values."""
+    version_keys = set()
+    for user_id, year, month, category in buckets:
+        for month_part in (f'{year}-{month}', '*'):
+            for category_part in (category, '*'):
+                version_keys.add(dashboard_version_key(user_id, 'summary', month_part, category_part))
+        version_keys.add(dashboard_version_key(user_id, 'monthly', year))
+    dashboard_cache_versions.delete(*version_keys)
+
+def dashboard_category_summary(user_id, selected_month, selected_category, year):
+    """Returns the doughnut chart labels/values for the given filters, served from the dashboard cache when possible."""
+    key = dashboard_cache_key(user_id, 'summary', f'{year}-{selected_month}' if selected_month else '*', selected_category or '*')
+    summary = dashboard_cache.get(key)
+    if summary is None:
+        rollup_query = ExpenseRollup.query.filter_by(user_id=user_id)
+        if selected_month:
+            rollup_query = rollup_query.filter_by(year=year, month=selected_month)
+        if selected_category:
+            rollup_query = rollup_query.filter_by(category=selected_category)
+        category_summary = rollup_query.with_entities(ExpenseRollup.category, db.func.sum(ExpenseRollup.total).label('total')).group_by(ExpenseRollup.category).order_by(db.func.sum(ExpenseRollup.total).desc()).all()
+        summary = {'labels': [item.category for item in category_summary], 'values': [float(item.total) for item in category_summary]}
+        dashboard_cache.set(key, summary)
+    return summary
+
+def dashboard_monthly_values(user_id, year):
+    """Returns the user's spend for each month of a year, served from the dashboard cache when possible."""
+    key = dashboard_cache_key(user_id, 'monthly', year)
+    monthly_values = dashboard_cache.get(key)
+    if monthly_values is None:
+        yearly_summary = db.session.query(ExpenseRollup.month, db.func.sum(ExpenseRollup.total).label('total')).filter(ExpenseRollup.user_id == user_id, ExpenseRollup.year == year).group_by(ExpenseRollup.month).all()
+        monthly_values_dict = {item.month: float(item.total) for item in yearly_summary}
+        monthly_values = [monthly_values_dict.get(m, 0) for m in range(1, 13)]
+        dashboard_cache.set(key, monthly_values)
+    return monthly_values
+
+def rebuild_rollups():
+    """Recomputes every rollup bucket and the UserStats counters from the source tables. Returns the number of buckets that were out of sync."""
+    year_col, month_col = db.extract('year', Expense.date), db.extract('month', Expense.date)
+    fresh = db.session.query(Expense.user_id, year_col, month_col, Expense.category, db.func.sum(Expense.amount), db.func.count(Expense.id)).group_by(Expense.user_id, year_col, month_col, Expense.category).all()
+    expected = {(row[0], int(row[1]), int(row[2]), row[3]): (float(row[4] or 0), row[5]) for row in fresh}
+    stored = {(b.user_id, b.year, b.month, b.category): (b.total, b.count) for b in ExpenseRollup.query.all()}
+    mismatched = sum(1 for key in expected.keys() | stored.keys() if key not in expected or key not in stored or abs(expected[key][0] - stored[key][0]) > 0.005 or expected[key][1] != stored[key][1])
+    ExpenseRollup.query.delete()
+    db.session.add_all(ExpenseRollup(user_id=k[0], year=k[1], month=k[2], category=k[3], total=v[0], count=v[1]) for k, v in expected.items())
+    expense_counts, lifetime_spend = Counter(), Counter()
+    for (user_id, _, _, _), (total, count) in expected.items():
+        expense_counts[user_id] += count; lifetime_spend[user_id] += total
+    recurring_counts = dict(db.session.query(RecurringExpense.user_id, db.func.count(RecurringExpense.id)).group_by(RecurringExpense.user_id).all())
+    for (user_id,) in db.session.query(User.id):
+        stats = db.session.get(UserStats, user_id) or UserStats(user_id=user_id, data_version=0)
+        stats.expense_count, stats.lifetime_spend, stats.recurring_count = expense_counts[user_id], lifetime_spend[user_id], recurring_counts.get(user_id, 0)
+        db.session.add(stats)
+        mark_user_data_changed(user_id)
+    db.session.commit()
+    dashboard_cache_versions.clear()
+    return mismatched
+
+RECURRING_FREQUENCIES = ('weekly', 'monthly', 'yearly')
+
+def recurring_occurrence(rec_expense, n):
+    """Returns the date of the n-th occurrence of a recurring rule, counted from its start date."""
+    if rec_expense.frequency == 'weekly': return rec_expense.start_date + timedelta(weeks=n)
+    if rec_expense.frequency == 'monthly': return rec_expense.start_date + relativedelta(months=n)
+    if rec_expense.frequency == 'yearly': return rec_expense.start_date + relativedelta(years=n)
+    return None
+
+def recurring_periods_between(frequency, start, end):
+    """Counts the calendar periods (weeks, months or years) between two dates."""
+    if frequency == 'weekly': return (end - start).days // 7
+    if frequency == 'monthly': return (end.year - start.year) * 12 + end.month - start.month
+    if frequency == 'yearly': return end.year - start.year
+    return None
+
+def recurring_schedule(rec_expense, today):
+    """Returns (due_dates, next_due_date) for a rule: every unprocessed occurrence up to today, computed without stepping through them."""
+    if recurring_occurrence(rec_expense, 1) is None: return [], None
+    processed = recurring_periods_between(rec_expense.frequency, rec_expense.start_date, rec_expense.last_processed_date) if rec_expense.last_processed_date else 0
+    due = recurring_periods_between(rec_expense.frequency, rec_expense.start_date, today) if today >= rec_expense.start_date else 0
+    if due > 0 and recurring_occurrence(rec_expense, due) > today: due -= 1
+    due_dates = [recurring_occurrence(rec_expense, n) for n in range(processed + 1, due + 1)]
+    return due_dates, recurring_occurrence(rec_expense, max(processed, due) + 1)
+
+def claim_recurring_expense(rec_expense, last_processed_date, next_due_date):
+    """Advances a rule's processing marker only if nobody else has moved it since it was read. Returns True when the claim succeeded."""
+    unchanged = RecurringExpense.last_processed_date.is_(None) if rec_expense.last_processed_date is None else RecurringExpense.last_processed_date == rec_expense.last_processed_date
+    result = db.session.execute(db.update(RecurringExpense).where(RecurringExpense.id == rec_expense.id, unchanged).values(last_processed_date=last_processed_date, next_due_date=next_due_date))
+    return result.rowcount == 1
+
+def materialize_recurring_expense(rec_expense, today):
+    """Bulk-inserts every due occurrence of a rule and refreshes its cached next_due_date. Returns the number of expenses added."""
+    due_dates, next_due_date = recurring_schedule(rec_expense, today)
+    if not due_dates:
+        rec_expense.next_due_date = next_due_date
+        return 0
+    if not claim_recurring_expense(rec_expense, due_dates[-1], next_due_date):
+        db.session.expire(rec_expense)
+        return 0
+    db.session.execute(db.insert(Expense), [dict(user_id=rec_expense.user_id, amount=rec_expense.amount, category=rec_expense.category, description=f"(Recurringy) {rec_expense.description}", date=d, is_recurring=True) for d in due_dates])
+    apply_rollup_deltas(rec_expense.user_id, {(year, month, rec_expense.category): (rec_expense.amount * n, n) for (year, month), n in Counter((d.year, d.month) for d in due_dates).items()})
+    return len(due_dates)
+
+def due_recurring_expenses_query(today):
+    return RecurringExpense.query.filter(RecurringExpense.frequency.in_(RECURRING_FREQUENCIES), RecurringExpense.start_date <= today, db.or_(RecurringExpense.next_due_date.is_(None), RecurringExpense.next_due_date <= today))
 
 def process_recurring_expenses(user):
-    today = date.today(); recurring_expenses_list = RecurringExpense.query.filter_by(user_id=user.id).all()
-    for rec_expense in recurring_expenses_list:
-        if rec_expense.start_date > today: continue
-        last_date = rec_expense.last_processed_date or rec_expense.start_date
-        while True:
-            next_due_date = None
-            if rec_expense.frequency == 'monthly': next_due_date = last_date + relativedelta(months=1)
-            elif rec_expense.frequency == 'weekly': next_due_date = last_date + relativedelta(weeks=1)
-            elif rec_expense.frequency == 'yearly': next_due_date = last_date + relativedelta(years=1)
-            if not next_due_date or next_due_date > today: break
-            new_expense = Expense(user_id=user.id, amount=rec_expense.amount, category=rec_expense.category, description=f"(Recurringy) {rec_expense.description}", date=next_due_date)
-            db.session.add(new_expense); rec_expense.last_processed_date = next_due_date; last_date = next_due_date
-            flash(f'Recurring expense added automaticallyy: {rec_expense.description}', 'info')
+    """Login catch-up: materializes the user's rules whose next_due_date has passed, so recurring expenses keep arriving without `flask run-scheduler`."""
+    today = date.today()
+    for rec_expense in due_recurring_expenses_query(today).filter(RecurringExpense.user_id == user.id).all():
+        added = materialize_recurring_expense(rec_expense, today)
+        if added == 1:
+            flash(f'Recurring expense added automatically: {rec_expense.description}', 'info')
+        elif added > 1:
+            flash(f'Recurring expense added automatically {added} times: {rec_expense.description}', 'info')
     db.session.commit()
 
-def setup_initial_data():
-    """Populates the database with initial achievements if they don't exist."""
-    achievements = {
-        'First Step': ('Added your first expense. Great job!', 'fa-shoe-prints'),
-        'Data Collector': ('Added 10 expenses.', 'fa-layer-group'),
-        'Budget Master': ('Set your first monthly budget!', 'fa-piggy-bank'),
-        'Goal Achiever': ('Congratulations! You reached your savings goal.', 'fa-bullseye'),
-        'Automator': ('Set up your first recurring expense!', 'fa-robot')
+def process_all_recurring_expenses(today, batch_size=100):
+    """Materializes due rules for every user in next_due_date order, committing once per batch. Returns (rules_processed, expenses_added)."""
+    rules_processed = expenses_added = 0
+    while True:
+        batch = due_recurring_expenses_query(today).order_by(RecurringExpense.next_due_date.asc().nulls_first(), RecurringExpense.id).limit(batch_size).all()
+        if not batch:
+            break
+        for rec_expense in batch:
+            expenses_added += materialize_recurring_expense(rec_expense, today)
+        db.session.commit()
+        rules_processed += len(batch)
+    return rules_processed, expenses_added
+
+def month_range(year, month):
+    """Returns the half-open [first day, first day of next month) range for a month, so date filters can use indexes."""
+    month_start = date(year, month, 1)
+    return month_start, month_start + relativedelta(months=1)
+
+def month_arg(value):
+    """Request-argument type for ?month=. Values outside 1..12 raise ValueError, so request.args.get() ignores them."""
+    month = int(value)
+    if not 1 <= month <= 12:
+        raise ValueError(f'invalid month {month}')
+    return month
+
+EXPENSE_PAGE_SIZE = 50
+
+def filtered_expenses_query(user_id, selected_month, selected_category, year):
+    query = Expense.query.filter_by(user_id=user_id)
+    if selected_month:
+        month_start, month_end = month_range(year, selected_month)
+        query = query.filter(Expense.date >= month_start, Expense.date < month_end)
+    if selected_category:
+        query = query.filter_by(category=selected_category)
+    return query
+
+def expense_page(query, cursor=None, page_size=EXPENSE_PAGE_SIZE):
+    """Returns one page of expenses, newest first, plus the (date, id) keyset cursor of the next page or None on the last page."""
+    if cursor:
+        try:
+            cursor_date, cursor_id = cursor.split('_')
+            cursor_date, cursor_id = datetime.strptime(cursor_date, '%Y-%m-%d').date(), int(cursor_id)
+        except ValueError:
+            abort(400)
+        query = query.filter(db.or_(Expense.date < cursor_date, db.and_(Expense.date == cursor_date, Expense.id < cursor_id)))
+    rows = query.order_by(Expense.date.desc(), Expense.id.desc()).limit(page_size + 1).all()
+    if len(rows) <= page_size:
+        return rows, None
+    last = rows[page_size - 1]
+    return rows[:page_size], f'{last.date.isoformat()}_{last.id}'
+
+def dashboard_budget(user, monthly_values):
+    """Returns the monthly limit and savings goal figures shown on the dashboard."""
+    current_month_expenses = float(monthly_values[datetime.now().month - 1])
+    budget_limit = user.monthly_limit or 0
+    saving_goal = user.saving_goal or 0
+    return {
+        'budget_limit': budget_limit,
+        'current_month_expenses': current_month_expenses,
+        'budget_remaining': budget_limit - current_month_expenses,
+        'budget_used_percent': int((current_month_expenses / budget_limit) * 100) if budget_limit > 0 else 0,
+        'saving_goal': saving_goal,
+        'saving_progress': max(0, saving_goal - current_month_expenses) if saving_goal else 0,
     }
-    for name, (desc, icon) in achievements.items():
-        if not Achievement.query.filter_by(name=name).first():
-            db.session.add(Achievement(name=name, description=desc, icon=icon))
+
+def forecast_inputs(user_id, today, window_days=FORECAST_WINDOW_DAYS):
+    """Loads per-day, per-category expense totals for the trailing window and this month, plus the user's recurring rules, as plain rows for build_forecast."""
+    since = min(today.replace(day=1), today - timedelta(days=window_days - 1))
+    history = db.session.execute(db.select(Expense.date, Expense.category, Expense.is_recurring, db.func.sum(Expense.amount)).where(Expense.user_id == user_id, Expense.date >= since, Expense.date < month_range(today.year, today.month)[1]).group_by(Expense.date, Expense.category, Expense.is_recurring)).all()
+    rules = db.session.execute(db.select(RecurringExpense.start_date, RecurringExpense.frequency, RecurringExpense.amount, RecurringExpense.category, RecurringExpense.last_processed_date).where(RecurringExpense.user_id == user_id, RecurringExpense.frequency.in_(RECURRING_FREQUENCIES))).all()
+    return history, rules
+
+def conditional_json(build_payload, version=None):
+    """Answers with 304 Not Modified while the client's ETag is current, otherwise with the JSON payload and a fresh ETag.
+
+    With a `version` (a cheap fingerprint of everything the payload is computed from) a match is answered without building the payload. Without one the ETag hashes the payload itself. That suits payloads read through the dashboard cache: a process-local cache learns of other processes' writes only through its TTL, so a shared version could run ahead of what it serves.
+    """
+    response = None
+    if version is None:
+        response = jsonify(build_payload())
+        etag = hashlib.sha1(response.get_data()).hexdigest()
+    else:
+        etag = hashlib.sha1(f'{current_user.id}:{version}:{date.today()}:{request.full_path}'.encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif response is None:
+        response = jsonify(build_payload())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def import_expenses(user, rows, batch_size=None):
+    """Validates parsed rows and inserts them in batched transactions, skipping rows whose (date, amount, description) was already imported. Returns a summary dict."""
+    batch_size = batch_size or app.config['IMPORT_BATCH_SIZE']
+    summary = {'imported': 0, 'duplicates': 0, 'invalid': 0, 'errors': []}
+    def flush_batch(batch):
+        existing = {h for (h,) in db.session.query(Expense.import_hash).filter(Expense.user_id == user.id, Expense.import_hash.in_(batch.keys()))}
+        new_rows = [row for h, row in batch.items() if h not in existing]
+        summary['duplicates'] += len(batch) - len(new_rows)
+        if new_rows:
+            db.session.execute(db.insert(Expense), new_rows)
+            totals, counts = Counter(), Counter()
+            for row in new_rows:
+                bucket = (row['date'].year, row['date'].month, row['category'])
+                totals[bucket] += row['amount']; counts[bucket] += 1
+            apply_rollup_deltas(user.id, {bucket: (totals[bucket], n) for bucket, n in counts.items()})
+        db.session.commit()
+        summary['imported'] += len(new_rows)
+    batch = {}
+    for line_number, row in rows:
+        try:
+            expense_date, amount, category, description = parse_import_row(row, EXPENSE_CATEGORIES)
+        except ValueError as error:
+            summary['invalid'] += 1
+            if len(summary['errors']) < 5:
+                summary['errors'].append(f'Line {line_number}: {error}')
+            continue
+        import_hash = expense_fingerprint(expense_date, amount, description)
+        # Repeats within a batch are caught here, repeats of earlier batches by the import_hash lookup in flush_batch.
+        if import_hash in batch:
+            summary['duplicates'] += 1
+            continue
+        batch[import_hash] = dict(user_id=user.id, amount=float(amount), category=category, date=expense_date, description=description, import_hash=import_hash)
+        if len(batch) >= batch_size:
+            flush_batch(batch); batch = {}
+    if batch:
+        flush_batch(batch)
+    if summary['imported']:
+        evaluate_achievements(user, 'expense')
+    return summary
+
+def open_import_rows(binary_stream, filename, file_format=None):
+    text_stream = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', errors='replace', newline='')
+    return parse_ofx(text_stream) if (file_format or detect_format(filename)) == 'ofx' else parse_csv(text_stream)
+
+EXPORT_FORMATS = {'csv': ('text/csv', iter_csv), 'jsonl': ('application/x-ndjson', iter_jsonl), 'parquet': ('application/vnd.apache.parquet', None)}
+
+def export_rows(user_id, dataset, selected_month=None, selected_category=None, year=None):
+    """Returns (fields, rows) for an export. Rows are streamed from the database in chunks instead of being loaded at once."""
+    if dataset == 'recurring':
+        query = RecurringExpense.query.filter_by(user_id=user_id)
+        if selected_category:
+            query = query.filter_by(category=selected_category)
+        columns = [getattr(RecurringExpense, field) for field in RECURRING_FIELDS]
+        return RECURRING_FIELDS, query.with_entities(*columns).order_by(RecurringExpense.id).yield_per(1000)
+    query = filtered_expenses_query(user_id, selected_month, selected_category, year or datetime.now().year)
+    columns = [getattr(Expense, field) for field in EXPENSE_FIELDS]
+    return EXPENSE_FIELDS, query.with_entities(*columns).order_by(Expense.date, Expense.id).yield_per(1000)
+
+# Indexes that later ones made redundant, e.g. a strict prefix of ix_expense_user_date_forecast. upgrade_schema() drops them from existing databases.
+OBSOLETE_INDEXES = {'expense': ('ix_expense_user_date',)}
+
+def upgrade_schema():
+    """Adds columns and indexes introduced after a database was created, since db.create_all() only creates missing tables, and drops OBSOLETE_INDEXES. Returns the added columns as 'table.column' names."""
+    inspector = db.inspect(db.engine)
+    quote = db.engine.dialect.identifier_preparer.quote
+    added_columns = []
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name): continue
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    default = f' NOT NULL DEFAULT {column.server_default.arg}' if column.server_default is not None else ''
+                    conn.execute(db.text(f'ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column.type.compile(db.engine.dialect)}{default}'))
+                    added_columns.append(f'{table.name}.{column.name}')
+                    if table.name == 'expense' and column.name == 'is_recurring':
+                        conn.execute(db.update(Expense).where(Expense.description.like('(Recurringy) %')).values(is_recurring=True))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for name in OBSOLETE_INDEXES.get(table.name, ()):
+                if name in existing_indexes:
+                    conn.execute(db.text(f'DROP INDEX {quote(name)}'))
+    return added_columns
+
+def backfill_rollups(added_columns=()):
+    """Fills the rollups and user counters from the source tables when they are empty but there is data to summarize, or when upgrade_schema() just added UserStats counter columns (which start at 0). Returns True when it rebuilt them."""
+    counters_added = any(name.startswith(f'{UserStats.__tablename__}.') for name in added_columns)
+    rollups_missing = db.session.query(Expense.id).first() is not None and db.session.query(ExpenseRollup.id).first() is None
+    stats_missing = db.session.query(User.id).first() is not None and db.session.query(UserStats.user_id).first() is None
+    if not (counters_added or rollups_missing or stats_missing):
+        return False
+    rebuild_rollups()
+    return True
+
+def setup_initial_data():
+    """Populates the database with the achievements declared in ACHIEVEMENT_RULES if they don't exist."""
+    for rule in ACHIEVEMENT_RULES:
+        if not Achievement.query.filter_by(name=rule.name).first():
+            db.session.add(Achievement(name=rule.name, description=rule.description, icon=rule.icon))
     db.session.commit()
+    _achievement_catalog.clear()
+
+ASSET_MAX_AGE = 365 * 24 * 3600
+asset_manifest = load_manifest(app.static_folder)
+
+def asset_url(filename, fallback=None):
+    """URL of a static file: its content-hashed build once `flask build-assets` has run, otherwise `fallback` (a CDN copy of a vendored file) or the plain static file."""
+    if filename in asset_manifest:
+        return url_for('dist_asset', filename=asset_manifest[filename])
+    return fallback or url_for('static', filename=filename)
+
+@app.context_processor
+def inject_asset_url():
+    return {'asset_url': asset_url}
+
+@app.route('/static/dist/<path:filename>')
+def dist_asset(filename):
+    """Serves hashed build output with a one-year immutable lifetime, pre-compressed when the client accepts gzip."""
+    if filename == MANIFEST_NAME:
+        abort(404)
+    dist = os.path.join(app.static_folder, DIST_FOLDER)
+    compressed_path = safe_join(dist, filename + '.gz')
+    compressed = 'gzip' in request.accept_encodings and compressed_path is not None and os.path.isfile(compressed_path)
+    response = send_from_directory(dist, filename + '.gz' if compressed else filename, mimetype=mimetypes.guess_type(filename)[0], max_age=ASSET_MAX_AGE)
+    if compressed:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 @app.route('/')
 def home():
@@ -177,32 +697,62 @@ def home():
 @app.route('/wallet')
 @login_required
 def wallet():
-    process_recurring_expenses(current_user)
-    selected_month = request.args.get('month', type=int)
+    selected_month = request.args.get('month', type=month_arg)
     selected_category = request.args.get('category', type=str)
     current_year = datetime.now().year
-    base_query = Expense.query.filter_by(user_id=current_user.id)
-    query_for_views = base_query
-    if selected_month:
-        query_for_views = query_for_views.filter(db.extract('year', Expense.date) == current_year, db.extract('month', Expense.date) == selected_month)
-    if selected_category:
-        query_for_views = query_for_views.filter_by(category=selected_category)
-    expenses_for_table = query_for_views.order_by(Expense.date.desc()).all()
-    category_summary = query_for_views.with_entities(Expense.category, db.func.sum(Expense.amount).label('total')).group_by(Expense.category).order_by(db.func.sum(Expense.amount).desc()).all()
-    labels = [item.category for item in category_summary]
-    values = [float(item.total) for item in category_summary]
-    budget_limit = current_user.monthly_limit or 0
-    saving_goal = current_user.saving_goal or 0
-    current_month_expenses = db.session.query(db.func.sum(Expense.amount)).filter(Expense.user_id == current_user.id, db.extract('year', Expense.date) == current_year, db.extract('month', Expense.date) == datetime.now().month).scalar() or 0
-    budget_remaining = budget_limit - float(current_month_expenses)
-    budget_used_percent = int((float(current_month_expenses) / budget_limit) * 100) if budget_limit > 0 else 0
-    saving_progress = max(0, saving_goal - float(current_month_expenses)) if saving_goal else 0
+    expenses_for_table, next_cursor = expense_page(filtered_expenses_query(current_user.id, selected_month, selected_category, current_year))
+    summary = dashboard_category_summary(current_user.id, selected_month, selected_category, current_year)
+    monthly_values = dashboard_monthly_values(current_user.id, current_year)
+    budget = dashboard_budget(current_user, monthly_values)
     from calendar import month_name
     monthly_labels = [month_name[i] for i in range(1, 13)]
-    yearly_summary = db.session.query(db.extract('month', Expense.date).label('month'), db.func.sum(Expense.amount).label('total')).filter(Expense.user_id == current_user.id, db.extract('year', Expense.date) == current_year).group_by(db.extract('month', Expense.date)).all()
-    monthly_values_dict = {item.month: float(item.total) for item in yearly_summary}
-    monthly_values = [monthly_values_dict.get(m, 0) for m in range(1, 13)]
-    return render_template('dashboard.html', expenses=expenses_for_table, labels=labels, values=values, budget_limit=budget_limit, current_month_expenses=float(current_month_expenses), budget_remaining=budget_remaining, budget_used_percent=budget_used_percent, selected_month=selected_month, selected_category=selected_category, saving_goal=saving_goal, saving_progress=saving_progress, current_year=current_year, monthly_labels=monthly_labels, monthly_values=monthly_values)
+    # Pop flashed messages now: the session cookie is saved before a streamed body is rendered.
+    get_flashed_messages(with_categories=True)
+    return stream_template('dashboard.html', expenses=expenses_for_table, next_cursor=next_cursor, labels=summary['labels'], values=summary['values'], selected_month=selected_month, selected_category=selected_category, current_year=current_year, monthly_labels=monthly_labels, monthly_values=monthly_values, **budget)
+
+@app.route('/api/expenses')
+@login_required
+def api_expenses():
+    selected_month = request.args.get('month', type=month_arg)
+    selected_category = request.args.get('category', type=str)
+    expenses, next_cursor = expense_page(filtered_expenses_query(current_user.id, selected_month, selected_category, datetime.now().year), cursor=request.args.get('cursor'))
+    return jsonify(expenses=[{'id': e.id, 'date': e.date.strftime('%Y-%m-%d'), 'category': e.category, 'amount': float(e.amount), 'description': e.description, 'edit_url': url_for('edit_expense', expense_id=e.id), 'delete_url': url_for('delete_expense', expense_id=e.id)} for e in expenses], next_cursor=next_cursor)
+
+@app.route('/api/summary')
+@login_required
+def api_summary():
+    selected_month = request.args.get('month', type=month_arg)
+    selected_category = request.args.get('category', type=str)
+    current_year = datetime.now().year
+    def build_payload():
+        payload = dashboard_category_summary(current_user.id, selected_month, selected_category, current_year)
+        return dict(payload, **dashboard_budget(current_user, dashboard_monthly_values(current_user.id, current_year)))
+    return conditional_json(build_payload)
+
+@app.route('/api/monthly')
+@login_required
+def api_monthly():
+    year = request.args.get('year', default=datetime.now().year, type=int)
+    from calendar import month_name
+    return conditional_json(lambda: {'year': year, 'labels': [month_name[i] for i in range(1, 13)], 'values': dashboard_monthly_values(current_user.id, year)})
+
+@app.route('/api/forecast')
+@login_required
+def api_forecast():
+    today = date.today()
+    try:
+        # The budget settings come from current_user, which another worker may serve from its user cache for up to USER_CACHE_TTL seconds; keeping them in the version means such a response is never pinned by later 304s.
+        version = f'{user_data_version(current_user.id)}:{current_user.monthly_limit}:{current_user.saving_goal}'
+        return conditional_json(lambda: build_forecast(today, *forecast_inputs(current_user.id, today), monthly_limit=current_user.monthly_limit, saving_goal=current_user.saving_goal), version=version)
+    except RuntimeError as error:
+        return jsonify(error=str(error)), 501
+
+@app.route('/api/cache-stats')
+@login_required
+def api_cache_stats():
+    if current_user.username not in app.config['ADMIN_USERNAMES']:
+        abort(403)
+    return jsonify(dashboard_cache.stats())
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -229,6 +779,7 @@ def login():
         user = User.query.filter_by(username=form.username.data).first()
         if user and user.check_password(form.password.data):
             login_user(user)
+            process_recurring_expenses(user)
             return redirect(url_for('home'))
         else:
             flash('Invalid username or password.', 'danger')
@@ -249,6 +800,7 @@ def profile():
         if current_user.check_password(password_form.old_password.data):
             current_user.set_password(password_form.new_password.data)
             db.session.commit()
+            forget_cached_user(current_user.id)
             flash('Your password has been changed successfully!', 'success')
             return redirect(url_for('profile'))
         else:
@@ -258,8 +810,10 @@ def profile():
 @app.route('/delete_account', methods=['POST'])
 @login_required
 def delete_account():
+    user_id = current_user.id
     db.session.delete(current_user)
     db.session.commit()
+    forget_cached_user(user_id)
     logout_user()
     flash('Your account and all associated data have been permanently deleted.', 'success')
     return redirect(url_for('login'))
@@ -272,19 +826,48 @@ def add_expense():
         expense_date = datetime.strptime(str(form.date.data), '%Y-%m-%d').date()
         new_expense = Expense(amount=form.amount.data, category=form.category.data, date=expense_date, description=form.description.data, user_id=current_user.id)
         db.session.add(new_expense)
+        apply_rollup_delta(current_user.id, expense_date, new_expense.category, new_expense.amount)
         db.session.commit()
-        if len(current_user.expenses) == 1:
-            award_achievement(current_user, 'First Step')
-        elif len(current_user.expenses) == 10:
-            award_achievement(current_user, 'Data Collector')
-        if current_user.saving_goal and current_user.saving_goal > 0:
-            total_spent = db.session.query(db.func.sum(Expense.amount)).filter_by(user_id=current_user.id).scalar()
-            if total_spent and total_spent >= current_user.saving_goal:
-                award_achievement(current_user, 'Goal Achiever')
+        evaluate_achievements(current_user, 'expense')
         flash('Expense added successfully!', 'success')
         return redirect(url_for('wallet'))
     return render_template('add_expense.html', title='Add Expense', form=form)
 
+@app.route('/import', methods=['GET', 'POST'])
+@login_required
+def import_expenses_view():
+    form = ImportForm()
+    if form.validate_on_submit():
+        upload = form.file.data
+        summary = import_expenses(current_user, open_import_rows(upload.stream, upload.filename))
+        flash(f"Imported {summary['imported']} expense(s), skipped {summary['duplicates']} duplicate(s) and {summary['invalid']} invalid row(s).", 'success' if summary['imported'] else 'info')
+        for error in summary['errors']:
+            flash(error, 'warning')
+        return redirect(url_for('wallet'))
+    return render_template('import_expenses.html', title='Import Expenses', form=form)
+
+@app.route('/export')
+@login_required
+def export_expenses_view():
+    dataset = 'recurring' if request.args.get('dataset') == 'recurring' else 'expenses'
+    file_format = request.args.get('format', 'csv')
+    if file_format not in EXPORT_FORMATS:
+        abort(400)
+    mimetype, writer = EXPORT_FORMATS[file_format]
+    fields, rows = export_rows(current_user.id, dataset, request.args.get('month', type=month_arg), request.args.get('category', type=str))
+    filename = f'{dataset}-{date.today().isoformat()}.{file_format}'
+    if writer:
+        return Response(stream_with_context(writer(rows, fields)), mimetype=mimetype, headers={'Content-Disposition': f'attachment; filename={filename}'})
+    parquet_file = tempfile.TemporaryFile()
+    try:
+        write_parquet(rows, fields, parquet_file)
+    except RuntimeError as error:
+        parquet_file.close()
+        flash(str(error), 'warning')
+        return redirect(url_for('wallet'))
+    parquet_file.seek(0)
+    return send_file(parquet_file, mimetype=mimetype, as_attachment=True, download_name=filename)
+
 @app.route('/edit_expense/<int:expense_id>', methods=['GET', 'POST'])
 @login_required
 def edit_expense(expense_id):
@@ -294,10 +877,12 @@ def edit_expense(expense_id):
         return redirect(url_for('wallet'))
     form = ExpenseForm(obj=expense)
     if form.validate_on_submit():
+        apply_rollup_delta(current_user.id, expense.date, expense.category, -expense.amount, count=-1)
         expense.amount = form.amount.data
         expense.category = form.category.data
         expense.date = datetime.strptime(str(form.date.data), '%Y-%m-%d').date()
         expense.description = form.description.data
+        apply_rollup_delta(current_user.id, expense.date, expense.category, expense.amount)
         db.session.commit()
         flash('Expense updated successfully!', 'success')
         return redirect(url_for('wallet'))
@@ -311,6 +896,7 @@ def delete_expense(expense_id):
     if expense.user_id != current_user.id:
         flash("You do not have permission to delete this expense.", "danger")
         return redirect(url_for('wallet'))
+    apply_rollup_delta(current_user.id, expense.date, expense.category, -expense.amount, count=-1)
     db.session.delete(expense)
     db.session.commit()
     flash("Expense has been deleted.", 'info')
@@ -324,8 +910,10 @@ def set_budget():
         form.limit.data = current_user.monthly_limit
     if form.validate_on_submit():
         current_user.monthly_limit = form.limit.data
+        mark_user_data_changed(current_user.id)
         db.session.commit()
-        award_achievement(current_user, 'Budget Master')
+        forget_cached_user(current_user.id)
+        evaluate_achievements(current_user, 'budget')
         flash("Your monthly budget has been saved.", 'success')
         return redirect(url_for('wallet'))
     return render_template('set_budget.html', title='Set Budget', form=form)
@@ -338,7 +926,9 @@ def set_goal():
         form.goal.data = current_user.saving_goal
     if form.validate_on_submit():
         current_user.saving_goal = form.goal.data
+        mark_user_data_changed(current_user.id)
         db.session.commit()
+        forget_cached_user(current_user.id)
         flash("Your savings goal has been saved.", 'success')
         return redirect(url_for('wallet'))
     return render_template('set_goal.html', title='Set Goal', form=form)
@@ -350,11 +940,14 @@ def recurring_expenses():
     if form.validate_on_submit():
         start_date_obj = datetime.strptime(form.start_date.data, '%Y-%m-%d').date()
         new_recurring_expense = RecurringExpense(user_id=current_user.id, amount=form.amount.data, category=form.category.data, description=form.description.data, frequency=form.frequency.data, start_date=start_date_obj)
+        new_recurring_expense.next_due_date = recurring_occurrence(new_recurring_expense, 1)
         db.session.add(new_recurring_expense)
+        mark_user_data_changed(current_user.id, recurring_count=1)
+        db.session.commit()
+        added = materialize_recurring_expense(new_recurring_expense, date.today())
         db.session.commit()
-        if RecurringExpense.query.filter_by(user_id=current_user.id).count() == 1:
-            award_achievement(current_user, 'Automator')
-        flash('New recurring expense added successfully!', 'success')
+        evaluate_achievements(current_user, 'recurring')
+        flash('New recurring expense added successfully!' + (f' {added} past occurrence(s) were added to your expenses.' if added else ''), 'success')
         return redirect(url_for('recurring_expenses'))
     user_recurring_expenses = RecurringExpense.query.filter_by(user_id=current_user.id).order_by(RecurringExpense.start_date.desc()).all()
     return render_template('recurring_expenses.html', title='Recurring Expenses', form=form, recurring_expenses=user_recurring_expenses)
@@ -363,9 +956,97 @@ def recurring_expenses():
 def init_db_command():
     """Creates new tables in the database and adds initial data."""
     db.create_all()
+    added_columns = upgrade_schema()
     setup_initial_data()
+    if backfill_rollups(added_columns):
+        print(">>> Rollups and user counters were backfilled from the existing expenses.")
     print(">>> The database has been successfully initialized. You can now run the application.")
 
+@app.cli.command("upgrade-db")
+def upgrade_db_command():
+    """Brings an existing database up to the current schema (new tables, columns and indexes) and backfills new rollup tables."""
+    db.create_all()
+    if backfill_rollups(upgrade_schema()):
+        print(">>> Rollups and user counters were backfilled from the existing expenses.")
+    print(">>> The database schema is up to date.")
+
+@app.cli.command("rebuild-rollups")
+def rebuild_rollups_command():
+    """Rebuilds the monthly/category expense rollups and per-user counters from the Expense table and reports drift."""
+    mismatched = rebuild_rollups()
+    if mismatched:
+        print(f">>> Rollups and user counters rebuilt. {mismatched} bucket(s) were out of sync and have been corrected.")
+    else:
+        print(">>> Rollups and user counters rebuilt. All buckets were consistent.")
+
+@app.cli.command("import-expenses")
+@click.argument('username')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ofx']), default=None, help='File format. Detected from the extension by default.')
+@click.option('--batch-size', default=None, type=int, help='Rows inserted per transaction (defaults to IMPORT_BATCH_SIZE).')
+def import_expenses_command(username, path, file_format, batch_size):
+    """Imports a CSV or OFX bank export into a user's expenses."""
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        raise click.ClickException(f"User '{username}' does not exist.")
+    with open(path, 'rb') as binary_stream:
+        summary = import_expenses(user, open_import_rows(binary_stream, path, file_format), batch_size=batch_size)
+    print(f">>> Imported {summary['imported']} expense(s), skipped {summary['duplicates']} duplicate(s) and {summary['invalid']} invalid row(s).")
+    for error in summary['errors']:
+        print(f"    {error}")
+
+@app.cli.command("export-expenses")
+@click.argument('username')
+@click.option('--dataset', type=click.Choice(['expenses', 'recurring']), default='expenses', show_default=True)
+@click.option('--format', 'file_format', type=click.Choice(list(EXPORT_FORMATS)), default='csv', show_default=True)
+@click.option('--month', type=click.IntRange(1, 12), default=None, help='Only export this month of the current year.')
+@click.option('--category', default=None, help='Only export this category.')
+@click.option('--output', default='-', show_default=True, help='Output file. Parquet needs a real path.')
+def export_expenses_command(username, dataset, file_format, month, category, output):
+    """Streams a user's expenses or recurring rules to CSV, JSON Lines or Parquet."""
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        raise click.ClickException(f"User '{username}' does not exist.")
+    fields, rows = export_rows(user.id, dataset, month, category)
+    writer = EXPORT_FORMATS[file_format][1]
+    if writer is None:
+        if output == '-':
+            raise click.ClickException("Parquet output needs --output PATH.")
+        try:
+            write_parquet(rows, fields, output)
+        except RuntimeError as error:
+            raise click.ClickException(str(error))
+        return
+    with (open(output, 'w', newline='', encoding='utf-8') if output != '-' else nullcontext(sys.stdout)) as stream:
+        for chunk in writer(rows, fields):
+            stream.write(chunk)
+
+@app.cli.command("build-assets")
+@click.option('--skip-vendor', is_flag=True, help="Don't download missing third-party modules into static/vendor.")
+def build_assets_command(skip_vendor):
+    """Copies static files into static/dist under content-hashed names, with gzip copies and a manifest for asset_url()."""
+    for name in ([] if skip_vendor else fetch_vendor_assets(app.static_folder)):
+        print(f">>> Could not download {VENDOR_ASSETS[name]}; pages will keep loading it from the CDN.")
+    manifest = build_assets(app.static_folder)
+    asset_manifest.clear()
+    asset_manifest.update(manifest)
+    print(f">>> Built {len(manifest)} asset(s) into {os.path.join(app.static_folder, DIST_FOLDER)}.")
+
+@app.cli.command("run-scheduler")
+@click.option('--batch-size', default=100, show_default=True, help='Recurring rules processed per transaction.')
+@click.option('--interval', default=300, show_default=True, help='Seconds to sleep between passes.')
+@click.option('--once', is_flag=True, help='Run a single pass and exit (e.g. from cron).')
+def run_scheduler_command(batch_size, interval, once):
+    """Materializes due recurring expenses for all users, independently of web requests."""
+    if isinstance(dashboard_cache, LRUCache):
+        print(">>> The dashboard cache is per process: web workers show these expenses once their entries expire (DASHBOARD_CACHE_TTL). Set CACHE_REDIS_URL to share invalidations.")
+    while True:
+        rules_processed, expenses_added = process_all_recurring_expenses(date.today(), batch_size=batch_size)
+        print(f">>> [{datetime.now():%Y-%m-%d %H:%M:%S}] Processed {rules_processed} recurring rule(s), added {expenses_added} expense(s).")
+        if once:
+            break
+        time.sleep(interval)
+
 if __name__ == '__main__':
 
     app.run(debug=True)
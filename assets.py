@@ -0,0 +1,71 @@
+"""Static asset build: content-hashed copies of static/ in static/dist, gzip siblings for text assets and a manifest for asset_url()."""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import urllib.request
+
+DIST_FOLDER = 'dist'
+MANIFEST_NAME = 'manifest.json'
+COMPRESSIBLE_EXTENSIONS = ('.js', '.mjs', '.css', '.svg', '.json', '.txt')
+# Third-party modules fetched into static/vendor/ at build time so they are served, hashed and cached like our own files.
+VENDOR_ASSETS = {
+    'vendor/three.module.js': 'https://cdnjs.cloudflare.com/ajax/libs/three.js/r128/three.module.js',
+}
+
+
+def fetch_vendor_assets(static_folder, timeout=30):
+    """Downloads the VENDOR_ASSETS that are not in static/ yet. Returns the paths that could not be fetched; pages fall back to the CDN for those."""
+    missing = []
+    for name, url in VENDOR_ASSETS.items():
+        target = os.path.join(static_folder, name)
+        if os.path.exists(target):
+            continue
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                content = response.read()
+        except OSError:
+            missing.append(name)
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(content)
+    return missing
+
+
+def build_assets(static_folder):
+    """Rebuilds static/dist from every other file in static/ and returns the manifest, mapping each source path to its hashed name."""
+    dist = os.path.join(static_folder, DIST_FOLDER)
+    shutil.rmtree(dist, ignore_errors=True)
+    os.makedirs(dist)
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != dist)
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            logical_name = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                content = f.read()
+            stem, extension = os.path.splitext(logical_name)
+            hashed_name = f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}'
+            target = os.path.join(dist, hashed_name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(content)
+            if extension in COMPRESSIBLE_EXTENSIONS:
+                with open(target + '.gz', 'wb') as f:
+                    f.write(gzip.compress(content, compresslevel=9, mtime=0))
+            manifest[logical_name] = hashed_name
+    with open(os.path.join(dist, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    """Returns the manifest written by build_assets, or an empty one when the assets have not been built."""
+    try:
+        with open(os.path.join(static_folder, DIST_FOLDER, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
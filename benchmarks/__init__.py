@@ -0,0 +1 @@
+"""Benchmarks for the expense tracker. Run a module with ``python -m benchmarks.<name>`` from the project root."""
@@ -0,0 +1,68 @@
+"""Drives parallel writer processes against one database and checks that no write is lost or rejected.
+
+    python -m benchmarks.bench_concurrency --workers 8 --writes 50
+    DATABASE_URL=postgresql://localhost/expenses_bench python -m benchmarks.bench_concurrency
+
+Every worker logs in as the same user and adds expenses to the same month and category,
+so all writers contend for the same rollup bucket and UserStats row.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+
+def worker(writes):
+    from app import app
+    app.config['WTF_CSRF_ENABLED'] = False
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench', 'password': 'bench-password'})
+    failures = 0
+    for n in range(writes):
+        try:
+            response = client.post('/add_expense', data={'amount': '1.25', 'category': 'Food', 'date': date.today().isoformat(), 'description': f'write {os.getpid()}-{n}'})
+            failures += response.status_code != 302
+        except Exception as error:
+            print(f"worker {os.getpid()}: {error}", file=sys.stderr)
+            failures += 1
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=50, help='Expenses added by each worker.')
+    args = parser.parse_args()
+    tmp = None
+    if not os.environ.get('DATABASE_URL'):
+        tmp = tempfile.TemporaryDirectory()
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+    from app import app, db, User, Expense, UserStats, setup_initial_data, rebuild_rollups
+    with app.app_context():
+        db.drop_all(); db.create_all(); setup_initial_data()
+        user = User(username='bench'); user.set_password('bench-password')
+        db.session.add(user); db.session.commit()
+        user_id = user.id
+        db.engine.dispose()
+    started = time.perf_counter()
+    with multiprocessing.get_context('spawn').Pool(args.workers) as pool:
+        failures = sum(pool.map(worker, [args.writes] * args.workers))
+    elapsed = time.perf_counter() - started
+    expected = args.workers * args.writes
+    with app.app_context():
+        stored = Expense.query.count()
+        counted = db.session.get(UserStats, user_id).expense_count
+        drifted = rebuild_rollups()
+    print(f"{args.workers} workers x {args.writes} writes in {elapsed:.2f}s ({expected / elapsed:.0f} writes/s)")
+    print(f"failed requests: {failures}, expenses stored: {stored}/{expected}, UserStats.expense_count: {counted}, drifted rollup buckets: {drifted}")
+    if tmp:
+        tmp.cleanup()
+    if failures or stored != expected or counted != expected or drifted:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
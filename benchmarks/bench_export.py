@@ -0,0 +1,89 @@
+"""Shows that the shipped export paths use flat memory as the number of exported rows grows.
+
+    python -m benchmarks.bench_export --rows 10000 100000 1000000
+
+Each size is exported through export_rows() and the CSV/JSON Lines writers, which is what
+`flask export-expenses` runs, and through GET /export on the test client, read chunk by chunk.
+Runs against a temporary SQLite database (or DATABASE_URL, which is wiped first).
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+CATEGORIES = ['Food', 'Transport', 'Housing', 'Subscriptions', 'Entertainment', 'Other']
+BENCH_PASSWORD = 'bench-password'
+
+
+def seed(rows, chunk=50000):
+    """Recreates the schema with one user who owns `rows` expenses and returns the user's id. Needs an app context."""
+    from app import db, User, Expense
+    db.drop_all(); db.create_all()
+    user = User(username='bench'); user.set_password(BENCH_PASSWORD)
+    db.session.add(user); db.session.commit()
+    start = date(2015, 1, 1)
+    for offset in range(0, rows, chunk):
+        db.session.execute(db.insert(Expense), [dict(user_id=user.id, amount=(n % 500) / 10, category=CATEGORIES[n % 6], date=start + timedelta(days=n % 3650), description=f'expense {n}') for n in range(offset, min(rows, offset + chunk))])
+        db.session.commit()
+    return user.id
+
+
+def measure(export):
+    """Drains export(), a generator of output chunks, under tracemalloc."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    exported_bytes = sum(len(chunk) for chunk in export())
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': round(elapsed, 3), 'peak_python_kib': round(peak / 1024, 1), 'exported_mib': round(exported_bytes / 2 ** 20, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    args = parser.parse_args()
+    tmp = None
+    if not os.environ.get('DATABASE_URL'):
+        tmp = tempfile.TemporaryDirectory()
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+    from app import app, db, export_rows, EXPORT_FORMATS
+    app.config['WTF_CSRF_ENABLED'] = False
+    results = []
+    for rows in args.rows:
+        with app.app_context():
+            user_id = seed(rows)
+        client = app.test_client()
+        client.post('/login', data={'username': 'bench', 'password': BENCH_PASSWORD})
+        for file_format in ('csv', 'jsonl'):
+            writer = EXPORT_FORMATS[file_format][1]
+            def export_command():
+                with app.app_context():
+                    fields, exported_rows = export_rows(user_id, 'expenses')
+                    yield from writer(exported_rows, fields)
+            def export_view():
+                response = client.get(f'/export?format={file_format}', buffered=False)
+                assert response.status_code == 200
+                try:
+                    yield from response.response
+                finally:
+                    response.close()
+            for path, export in (('export_rows', export_command), ('/export', export_view)):
+                result = dict(rows=rows, format=file_format, path=path, **measure(export))
+                results.append(result)
+                print(f"{rows:>9} rows  {file_format:<5}  {path:<11}  {result['seconds']:>8.3f}s  peak {result['peak_python_kib']:>9.1f} KiB  output {result['exported_mib']:>8.2f} MiB")
+    with app.app_context():
+        db.engine.dispose()
+    if tmp:
+        tmp.cleanup()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
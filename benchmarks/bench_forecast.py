@@ -0,0 +1,66 @@
+"""Times the dashboard forecast (history query plus vectorized projection) for one user with a large expense history.
+
+    python -m benchmarks.bench_forecast --expenses 100000 --recurring 20 --budget-ms 25
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+
+
+def measure(action, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        action()
+        samples.append((time.perf_counter() - started) * 1000)
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {'p50_ms': round(cuts[49], 3), 'p95_ms': round(cuts[94], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--expenses', type=int, default=100000)
+    parser.add_argument('--recurring', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--budget-ms', type=float, default=25.0, help='Fail when the end-to-end p95 (history query plus projection, as served by /api/forecast) exceeds this.')
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    args = parser.parse_args()
+    tmp = None
+    if not os.environ.get('DATABASE_URL'):
+        tmp = tempfile.TemporaryDirectory()
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+    from app import app, db, User, setup_initial_data, forecast_inputs
+    from benchmarks.datagen import seed
+    from forecast import build_forecast
+    today = date.today()
+    with app.app_context():
+        db.drop_all(); db.create_all(); setup_initial_data()
+        user_id, = seed(1, args.expenses, args.recurring)
+        user = db.session.get(User, user_id)
+        monthly_limit, saving_goal = user.monthly_limit or 3000, user.saving_goal or 5000
+        history, rules = forecast_inputs(user_id, today)
+        results = {
+            'expenses': args.expenses, 'recurring': args.recurring, 'history_rows': len(history),
+            'query': measure(lambda: forecast_inputs(user_id, today), args.repeat),
+            'projection': measure(lambda: build_forecast(today, history, rules, monthly_limit, saving_goal), args.repeat),
+            'end_to_end': measure(lambda: build_forecast(today, *forecast_inputs(user_id, today), monthly_limit, saving_goal), args.repeat),
+        }
+        db.engine.dispose()
+    if tmp:
+        tmp.cleanup()
+    print(f"{args.expenses} expenses, {args.recurring} recurring rules -> {results['history_rows']} grouped history rows")
+    for name in ('query', 'projection', 'end_to_end'):
+        print(f"  {name:<12} p50 {results[name]['p50_ms']:>8.3f}ms  p95 {results[name]['p95_ms']:>8.3f}ms")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if results['end_to_end']['p95_ms'] > args.budget_ms:
+        raise SystemExit(f"end-to-end p95 {results['end_to_end']['p95_ms']}ms exceeds the {args.budget_ms}ms budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Compares two result files written by benchmarks.run and flags latency regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+
+def flatten(report):
+    rows = {}
+    for result in report['results']:
+        for name, stats in list(result['micro'].items()) + [('load', result['load'])]:
+            rows[(result['size'], name)] = stats
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--metric', default='p95_ms', choices=['p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request'])
+    parser.add_argument('--threshold', type=float, default=10.0, help='Percent increase reported as a regression.')
+    args = parser.parse_args()
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    before, after = flatten(baseline), flatten(candidate)
+    print(f"{args.metric}: {baseline.get('commit')} -> {candidate.get('commit')}")
+    regressions = 0
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key][args.metric], after[key][args.metric]
+        change = (new - old) / old * 100 if old else 0.0
+        flag = 'REGRESSION' if change > args.threshold else ''
+        regressions += bool(flag)
+        print(f"  {key[0]:<14} {key[1]:<28} {old:>10.2f} {new:>10.2f} {change:>+8.1f}% {flag}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
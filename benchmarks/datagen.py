@@ -0,0 +1,59 @@
+"""Synthetic multi-user data generator. Writes straight into the User, Expense and RecurringExpense tables.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.datagen --users 50 --expenses 2000 --recurring 5
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from werkzeug.security import generate_password_hash
+
+BENCH_PASSWORD = 'bench-password'
+CATEGORIES = ['Food', 'Transport', 'Housing', 'Subscriptions', 'Entertainment', 'Other']
+FREQUENCIES = ['weekly', 'monthly', 'yearly']
+
+
+def seed(users, expenses_per_user, recurring_per_user, years=3, chunk=20000, random_seed=0):
+    """Creates users bench0..benchN-1 (password BENCH_PASSWORD) with random history, then rebuilds rollups and counters. Needs an app context."""
+    from app import db, User, Expense, RecurringExpense, rebuild_rollups
+    rng = random.Random(random_seed)
+    today = date.today()
+    first_day = today - timedelta(days=365 * years)
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    user_ids = []
+    for n in range(users):
+        user = User(username=f'bench{n}', password_hash=password_hash, monthly_limit=rng.choice([0, 1500, 3000]), saving_goal=rng.choice([None, 5000]))
+        db.session.add(user)
+        db.session.flush()
+        user_ids.append(user.id)
+    db.session.commit()
+    rows = []
+    for user_id in user_ids:
+        for n in range(expenses_per_user):
+            rows.append(dict(user_id=user_id, amount=round(rng.uniform(1, 250), 2), category=rng.choice(CATEGORIES), date=first_day + timedelta(days=rng.randrange((today - first_day).days + 1)), description=f'expense {n}'))
+            if len(rows) >= chunk:
+                db.session.execute(db.insert(Expense), rows); db.session.commit(); rows = []
+        db.session.execute(db.insert(RecurringExpense), [dict(user_id=user_id, amount=round(rng.uniform(5, 100), 2), category=rng.choice(CATEGORIES), description=f'rule {n}', frequency=FREQUENCIES[n % len(FREQUENCIES)], start_date=first_day + timedelta(days=rng.randrange(365))) for n in range(recurring_per_user)])
+    if rows:
+        db.session.execute(db.insert(Expense), rows)
+    db.session.commit()
+    rebuild_rollups()
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--expenses', type=int, default=1000, help='Expenses per user.')
+    parser.add_argument('--recurring', type=int, default=5, help='Recurring rules per user.')
+    parser.add_argument('--years', type=int, default=3, help='How far back the generated history goes.')
+    args = parser.parse_args()
+    from app import app, db, setup_initial_data
+    with app.app_context():
+        db.create_all(); setup_initial_data()
+        seed(args.users, args.expenses, args.recurring, years=args.years)
+    print(f">>> Seeded {args.users} user(s) with {args.expenses} expense(s) and {args.recurring} recurring rule(s) each.")
+
+
+if __name__ == '__main__':
+    main()
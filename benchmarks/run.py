@@ -0,0 +1,208 @@
+"""Micro-benchmarks and a test-client load driver, run against freshly generated data of several sizes.
+
+    python -m benchmarks.run --sizes 10x1000x5 10x10000x5 --output results.json
+    python -m benchmarks.compare baseline.json results.json
+
+Each size is USERSxEXPENSESxRECURRING and runs in its own process against a temporary SQLite
+database (or DATABASE_URL, which is wiped first). Results report p50/p95/p99 latency in
+milliseconds, SQL queries per request and the peak RSS of the benchmark process.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_rss_mib():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2 ** 20 if sys.platform == 'darwin' else 1024), 1)
+
+
+def summarize(latencies, queries):
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {'requests': len(latencies), 'p50_ms': round(cuts[49], 2), 'p95_ms': round(cuts[94], 2), 'p99_ms': round(cuts[98], 2), 'queries_per_request': round(sum(queries) / len(queries), 1)}
+
+
+class QueryCounter:
+    """Counts SQL statements per thread through an engine event."""
+
+    def __init__(self, engine):
+        self._local = threading.local()
+        from sqlalchemy import event
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+
+def timed(counter, action):
+    counter.reset()
+    started = time.perf_counter()
+    action()
+    return (time.perf_counter() - started) * 1000, counter.count
+
+
+def logged_in_client(app, username):
+    from benchmarks.datagen import BENCH_PASSWORD
+    client = app.test_client()
+    response = client.post('/login', data={'username': username, 'password': BENCH_PASSWORD})
+    assert response.status_code == 302, f'login failed for {username}'
+    return client
+
+
+def micro_benchmarks(app, counter, users, repeat):
+    from app import db, dashboard_cache, Expense, RecurringExpense, apply_rollup_delta, process_all_recurring_expenses
+    from benchmarks.datagen import BENCH_PASSWORD
+    results = {}
+    client = logged_in_client(app, 'bench0')
+    def wallet_cold():
+        dashboard_cache.clear()
+        response = client.get('/wallet')
+        assert response.status_code == 200
+        response.get_data()
+    samples = [timed(counter, wallet_cold) for _ in range(repeat)]
+    results['wallet_cold_cache'] = summarize(*zip(*samples))
+    samples = [timed(counter, lambda: client.get('/wallet').get_data()) for _ in range(repeat)]
+    results['wallet_warm_cache'] = summarize(*zip(*samples))
+    today = date.today().isoformat()
+    samples = [timed(counter, lambda: client.post('/add_expense', data={'amount': '9.99', 'category': 'Food', 'date': today, 'description': 'bench'})) for _ in range(repeat)]
+    results['add_expense'] = summarize(*zip(*samples))
+    # A fresh client per sample: a logged-in client is redirected before the password is checked.
+    samples = []
+    for _ in range(max(1, repeat // 5)):
+        anonymous = app.test_client()
+        samples.append(timed(counter, lambda: anonymous.post('/login', data={'username': f'bench{random.randrange(users)}', 'password': BENCH_PASSWORD})))
+    results['login'] = summarize(*zip(*samples))
+    samples = []
+    with app.app_context():
+        for _ in range(min(users, repeat)):
+            # Undo earlier materializations so every sample inserts the same occurrences into clean rollups.
+            materialized = Expense.query.filter(Expense.is_recurring)
+            for expense in materialized:
+                apply_rollup_delta(expense.user_id, expense.date, expense.category, -expense.amount, count=-1)
+            materialized.delete(synchronize_session=False)
+            RecurringExpense.query.update({'last_processed_date': None, 'next_due_date': None})
+            db.session.commit()
+            samples.append(timed(counter, lambda: process_all_recurring_expenses(date.today())))
+    results['process_all_recurring_expenses'] = summarize(*zip(*samples))
+    return results
+
+
+def load_test(app, counter, users, threads, requests_per_thread):
+    """Replays a mixed dashboard workload from several threads, each logged in as a different user."""
+    latencies, queries = [], []
+    lock = threading.Lock()
+    today = date.today().isoformat()
+    def run(thread_number):
+        client = logged_in_client(app, f'bench{thread_number % users}')
+        rng = random.Random(thread_number)
+        local = []
+        for _ in range(requests_per_thread):
+            roll = rng.random()
+            if roll < 0.6:
+                action = lambda: client.get(f'/wallet?month={rng.randint(1, 12)}' if rng.random() < 0.3 else '/wallet').get_data()
+            elif roll < 0.85:
+                action = lambda: client.get('/api/summary')
+            elif roll < 0.95:
+                action = lambda: client.get('/api/expenses')
+            else:
+                action = lambda: client.post('/add_expense', data={'amount': '4.50', 'category': 'Transport', 'date': today, 'description': 'load'})
+            local.append(timed(counter, action))
+        with lock:
+            for latency, count in local:
+                latencies.append(latency); queries.append(count)
+    started = time.perf_counter()
+    workers = [threading.Thread(target=run, args=(n,)) for n in range(threads)]
+    for thread in workers: thread.start()
+    for thread in workers: thread.join()
+    elapsed = time.perf_counter() - started
+    return dict(summarize(latencies, queries), threads=threads, requests_per_second=round(len(latencies) / elapsed, 1))
+
+
+def run_size(size, repeat, threads, requests_per_thread, queue):
+    users, expenses, recurring = (int(part) for part in size.split('x'))
+    tmp = None
+    if not os.environ.get('DATABASE_URL'):
+        tmp = tempfile.TemporaryDirectory()
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+    from app import app, db, setup_initial_data, process_all_recurring_expenses
+    from benchmarks.datagen import seed
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.drop_all(); db.create_all(); setup_initial_data()
+        started = time.perf_counter()
+        seed(users, expenses, recurring)
+        seed_seconds = time.perf_counter() - started
+        # Book every due occurrence up front, so the first login of each user doesn't include a catch-up.
+        process_all_recurring_expenses(date.today())
+        counter = QueryCounter(db.engine)
+    result = {'size': size, 'users': users, 'expenses_per_user': expenses, 'recurring_per_user': recurring, 'seed_seconds': round(seed_seconds, 2)}
+    result['micro'] = micro_benchmarks(app, counter, users, repeat)
+    result['load'] = load_test(app, counter, users, threads, requests_per_thread)
+    result['peak_rss_mib'] = peak_rss_mib()
+    queue.put(result)
+    if tmp:
+        with app.app_context():
+            db.engine.dispose()
+        tmp.cleanup()
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=['10x1000x5', '10x10000x5'], help='USERSxEXPENSESxRECURRING data sizes.')
+    parser.add_argument('--repeat', type=int, default=30, help='Samples per micro-benchmark.')
+    parser.add_argument('--threads', type=int, default=4, help='Concurrent clients in the load test.')
+    parser.add_argument('--requests', type=int, default=50, help='Requests per load-test client.')
+    parser.add_argument('--output', default=f"benchmarks/results/{datetime.now():%Y%m%d-%H%M%S}.json")
+    args = parser.parse_args()
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for size in args.sizes:
+        queue = context.Queue()
+        process = context.Process(target=run_size, args=(size, args.repeat, args.threads, args.requests, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        results.append(result)
+        print(f"{size}: seeded in {result['seed_seconds']}s, peak RSS {result['peak_rss_mib']} MiB")
+        for name, stats in list(result['micro'].items()) + [('load', result['load'])]:
+            print(f"  {name:<30} p50 {stats['p50_ms']:>8.2f}ms  p95 {stats['p95_ms']:>8.2f}ms  p99 {stats['p99_ms']:>8.2f}ms  {stats['queries_per_request']:>5} queries/request")
+    report = {'commit': git_commit(), 'created': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(), 'database': os.environ.get('DATABASE_URL', 'sqlite (temporary)').split('@')[-1], 'results': results}
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f">>> Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
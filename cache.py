@@ -0,0 +1,91 @@
+"""Per-process and Redis-backed caches for computed dashboard data."""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """In-process cache with a per-entry TTL that evicts the least recently used entry once max_entries is reached."""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {'backend': 'lru', 'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries), 'max_entries': self.max_entries}
+
+
+class RedisCache:
+    """Cache stored in a Redis-compatible server, shared by every worker process. Values must be JSON serializable."""
+
+    def __init__(self, client, ttl=300, prefix='expense-tracker:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+    def stats(self):
+        return {'backend': 'redis', 'hits': self.hits, 'misses': self.misses}
+
+
+def create_cache(redis_url=None, max_entries=1024, ttl=300):
+    """Returns a RedisCache when a URL is configured and the redis package is installed, otherwise an LRUCache."""
+    if redis_url:
+        try:
+            import redis
+        except ImportError:
+            print("WARNING: CACHE_REDIS_URL is set but the 'redis' package is not installed. Using the in-process cache.")
+        else:
+            return RedisCache(redis.Redis.from_url(redis_url), ttl=ttl)
+    return LRUCache(max_entries=max_entries, ttl=ttl)
@@ -0,0 +1,56 @@
+"""Incremental writers for expense exports (CSV, JSON Lines and optionally Parquet)."""
+import csv
+import io
+import json
+from datetime import date
+
+EXPENSE_FIELDS = ['date', 'category', 'amount', 'description']
+RECURRING_FIELDS = ['description', 'category', 'amount', 'frequency', 'start_date', 'last_processed_date', 'next_due_date']
+FLUSH_EVERY = 500
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def iter_csv(rows, fields):
+    """Yields CSV text in chunks of FLUSH_EVERY rows, so only one chunk is held in memory at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for n, row in enumerate(rows, start=1):
+        writer.writerow([_plain(value) for value in row])
+        if n % FLUSH_EVERY == 0:
+            yield buffer.getvalue()
+            buffer.seek(0); buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_jsonl(rows, fields):
+    """Yields one JSON object per line, batched like iter_csv."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({field: _plain(value) for field, value in zip(fields, row)}) + '\n')
+        if len(lines) >= FLUSH_EVERY:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines)
+
+
+def write_parquet(rows, fields, sink, batch_size=10000):
+    """Writes rows to a Parquet file path or binary file object one record batch at a time. Requires the optional pyarrow package."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires the 'pyarrow' package.")
+    schema = pa.schema([(field, pa.float64() if field == 'amount' else pa.date32() if field.endswith('date') else pa.string()) for field in fields])
+    with pq.ParquetWriter(sink, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                writer.write_batch(pa.RecordBatch.from_pylist([dict(zip(fields, values)) for values in batch], schema=schema))
+                batch = []
+        if batch:
+            writer.write_batch(pa.RecordBatch.from_pylist([dict(zip(fields, values)) for values in batch], schema=schema))
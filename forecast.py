@@ -0,0 +1,117 @@
+"""Vectorized spending forecasts: month-end projections per category, the budget-overrun date and a savings-goal ETA. Requires the optional numpy package."""
+import math
+from datetime import timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FORECAST_WINDOW_DAYS = 90
+FREQUENCY_CODES = {'weekly': 0, 'monthly': 1, 'yearly': 2}
+MONTHLY_FACTORS = (52 / 12, 1, 1 / 12)
+MAX_ETA_MONTHS = 1200
+
+
+def _columns(rows, width):
+    """Transposes query rows into one tuple per column."""
+    return list(zip(*rows)) or [()] * width
+
+
+def _totals(codes, weights, size):
+    """Sums weights per code; always float, even for empty input."""
+    return np.bincount(codes, weights=weights, minlength=size).astype(float)
+
+
+def _periods(frequencies, starts, ends):
+    """Whole weeks, months or years from starts to ends per rule, matching app.recurring_periods_between. NaT ends count as 0."""
+    months = ends.astype('datetime64[M]') - starts.astype('datetime64[M]')
+    periods = np.where(frequencies == 0, (ends - starts).astype('int64') // 7, np.where(frequencies == 2, months.astype('int64') // 12, months.astype('int64')))
+    return np.where(np.isnat(ends), 0, periods)
+
+
+def expand_recurring(starts, frequencies, processed, until):
+    """Returns (rule_index, dates) for every occurrence after the first `processed` ones of each rule, up to `until`. Month-end days are clipped like relativedelta."""
+    until = np.datetime64(until, 'D')
+    month_step = np.where(frequencies == 2, 12, 1)
+    start_months = starts.astype('datetime64[M]')
+    first = processed + 1
+    counts = np.clip(_periods(frequencies, starts, np.full(len(starts), until)) - first + 1, 0, None)
+    rule_index = np.repeat(np.arange(len(starts)), counts)
+    n = first[rule_index] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    months = start_months[rule_index] + n * month_step[rule_index]
+    month_days = months.astype('datetime64[D]')
+    month_lengths = (months + 1).astype('datetime64[D]') - month_days
+    start_days = (starts - start_months.astype('datetime64[D]'))[rule_index]
+    dates = np.where(frequencies[rule_index] == 0, starts[rule_index] + 7 * n, month_days + np.minimum(start_days, month_lengths - 1))
+    keep = dates <= until
+    return rule_index[keep], dates[keep]
+
+
+def build_forecast(today, history_rows, rule_rows, monthly_limit=0, saving_goal=0, window_days=FORECAST_WINDOW_DAYS):
+    """Projects this month's spending from (date, category, is_recurring, total) history rows and (start_date, frequency, amount, category, last_processed_date) rule rows.
+
+    Discretionary spend is extrapolated at its trailing `window_days` daily rate. Recurring spend comes from the rules' unprocessed occurrences.
+    """
+    if np is None:
+        raise RuntimeError("Forecasts require the 'numpy' package.")
+    month_start = today.replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    today64, month_start64, month_end64 = (np.datetime64(day, 'D') for day in (today, month_start, month_end))
+    history_dates, history_categories, history_recurring, history_totals = _columns(history_rows, 4)
+    history_categories = tuple(category or 'Other' for category in history_categories)
+    rule_starts, rule_frequencies, rule_amounts, rule_categories, rule_processed = _columns(rule_rows, 5)
+    categories, codes = np.unique(np.array(history_categories + rule_categories, dtype=object), return_inverse=True)
+    history_codes, rule_codes = codes[:len(history_categories)], codes[len(history_categories):]
+    history_dates = np.array(history_dates, dtype='datetime64[D]')
+    history_totals = np.nan_to_num(np.array(history_totals, dtype=float))
+    history_recurring = np.array(history_recurring, dtype=bool)
+
+    in_month = (history_dates >= month_start64) & (history_dates <= month_end64)
+    spent = _totals(history_codes[in_month], history_totals[in_month], len(categories))
+    in_window = (history_dates > today64 - window_days) & (history_dates <= today64) & ~history_recurring
+    observed_days = min(window_days, int((today64 - history_dates[in_window].min()).astype('int64')) + 1) if in_window.any() else window_days
+    daily_rate = _totals(history_codes[in_window], history_totals[in_window], len(categories)) / observed_days
+
+    rule_starts = np.array(rule_starts, dtype='datetime64[D]')
+    rule_frequencies = np.array([FREQUENCY_CODES[frequency] for frequency in rule_frequencies], dtype='int64')
+    rule_amounts = np.array(rule_amounts, dtype=float)
+    processed = _periods(rule_frequencies, rule_starts, np.array(rule_processed, dtype='datetime64[D]'))
+    rule_index, occurrence_dates = expand_recurring(rule_starts, rule_frequencies, processed, month_end)
+    # Overdue occurrences are booked on the next scheduler run, i.e. today.
+    occurrence_dates = np.maximum(occurrence_dates, today64)
+    occurrence_amounts = rule_amounts[rule_index]
+    recurring = _totals(rule_codes[rule_index], occurrence_amounts, len(categories))
+    projected = daily_rate * int((month_end64 - today64).astype('int64'))
+    forecast = spent + recurring + projected
+
+    daily = _totals((history_dates[in_month] - month_start64).astype('int64'), history_totals[in_month], month_end.day)
+    daily += _totals((occurrence_dates - month_start64).astype('int64'), occurrence_amounts, month_end.day)
+    daily[today.day:] += daily_rate.sum()
+    over_budget = np.flatnonzero(np.cumsum(daily) > monthly_limit) if monthly_limit else ()
+    budget_overrun_date = month_start + timedelta(days=int(over_budget[0])) if len(over_budget) else None
+
+    projected_monthly_spend = daily_rate.sum() * 365.25 / 12 + (rule_amounts * np.take(MONTHLY_FACTORS, rule_frequencies)).sum()
+    projected_monthly_saving = (monthly_limit or 0) - projected_monthly_spend
+    saving_goal_eta = None
+    if saving_goal and monthly_limit:
+        saved_this_month = max(0.0, monthly_limit - forecast.sum())
+        months = 0 if saved_this_month >= saving_goal else math.ceil((saving_goal - saved_this_month) / projected_monthly_saving) if projected_monthly_saving > 0 else None
+        if months is not None and months <= MAX_ETA_MONTHS:
+            saving_goal_eta = ((np.datetime64(month_start, 'M') + months + 1).astype('datetime64[D]') - 1).item()
+
+    order = np.argsort(-forecast, kind='stable')
+    return {
+        'as_of': today.isoformat(),
+        'month_end': month_end.isoformat(),
+        'categories': [{'category': categories[i], 'spent': round(float(spent[i]), 2), 'recurring': round(float(recurring[i]), 2), 'projected': round(float(projected[i]), 2), 'forecast': round(float(forecast[i]), 2)} for i in order if forecast[i]],
+        'spent_total': round(float(spent.sum()), 2),
+        'forecast_total': round(float(forecast.sum()), 2),
+        'daily_rate': round(float(daily_rate.sum()), 2),
+        'budget_limit': monthly_limit or 0,
+        'budget_overrun_date': budget_overrun_date.isoformat() if budget_overrun_date else None,
+        'saving_goal': saving_goal or 0,
+        'projected_monthly_spend': round(float(projected_monthly_spend), 2),
+        'projected_monthly_saving': round(float(projected_monthly_saving), 2),
+        'saving_goal_eta': saving_goal_eta.isoformat() if saving_goal_eta else None,
+    }
@@ -0,0 +1,83 @@
+"""Streaming parsers for bank exports (CSV and OFX) used by the expense import."""
+import csv
+import hashlib
+import os
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+OFX_CHUNK_SIZE = 64 * 1024
+
+
+def detect_format(filename):
+    return 'ofx' if os.path.splitext(filename or '')[1].lower() in ('.ofx', '.qfx') else 'csv'
+
+
+def parse_csv(stream):
+    """Yields (line_number, row) for a CSV with date, amount, category and description columns (header names are case-insensitive)."""
+    reader = csv.DictReader(stream)
+    if reader.fieldnames:
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    for row in reader:
+        yield reader.line_num, {key: (value or '').strip() for key, value in row.items() if key}
+
+
+def _ofx_tags(stream):
+    """Yields (TAG, text) pairs from an OFX/SGML stream, reading it in fixed-size chunks."""
+    buffer = ''
+    while True:
+        chunk = stream.read(OFX_CHUNK_SIZE)
+        parts = (buffer + chunk).split('<')
+        buffer = parts.pop() if chunk else ''
+        for part in parts:
+            if '>' in part:
+                tag, _, text = part.partition('>')
+                yield tag.strip().upper(), text.strip()
+        if not chunk:
+            return
+
+
+def parse_ofx(stream):
+    """Yields (transaction_number, row) for every debit STMTTRN block of an OFX statement, as a positive amount. Credits (deposits, refunds) are skipped."""
+    transaction, number = None, 0
+    for tag, text in _ofx_tags(stream):
+        if tag == 'STMTTRN':
+            transaction, number = {}, number + 1
+        elif tag == '/STMTTRN' and transaction is not None:
+            amount = transaction.get('TRNAMT', '')
+            if transaction.get('TRNTYPE', '').upper() == 'CREDIT' or not amount.startswith('-'):
+                transaction = None
+                continue
+            amount = amount[1:]
+            description = transaction.get('NAME') or transaction.get('MEMO', '')
+            yield number, {'date': transaction.get('DTPOSTED', '')[:8], 'amount': amount, 'category': '', 'description': description}
+            transaction = None
+        elif transaction is not None and not tag.startswith('/'):
+            transaction[tag] = text
+
+
+def parse_import_row(row, categories, default_category='Other'):
+    """Validates a parsed row and returns (date, amount, category, description). Raises ValueError with a readable message."""
+    raw_date = row.get('date', '')
+    for date_format in ('%Y-%m-%d', '%Y%m%d'):
+        try:
+            expense_date = datetime.strptime(raw_date, date_format).date()
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError(f"invalid date '{raw_date}'")
+    try:
+        amount = Decimal(row.get('amount', '').replace(',', ''))
+    except InvalidOperation:
+        raise ValueError(f"invalid amount '{row.get('amount', '')}'")
+    if not amount.is_finite() or amount <= 0:
+        raise ValueError(f"invalid amount '{row.get('amount', '')}'")
+    category = row.get('category') or default_category
+    if category not in categories:
+        raise ValueError(f"unknown category '{category}'")
+    return expense_date, amount, category, row.get('description', '')[:100]
+
+
+def expense_fingerprint(expense_date, amount, description):
+    """Returns the hash used to skip expenses that were already imported."""
+    return hashlib.sha1(f'{expense_date.isoformat()}|{Decimal(amount):.2f}|{description or ""}'.encode()).hexdigest()
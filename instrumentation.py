@@ -0,0 +1,122 @@
+"""Opt-in request instrumentation: SQL counts and timings, N+1 detection, template timing, Server-Timing and a sampling profiler."""
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import g, request, abort, Response, has_request_context, before_render_template, template_rendered
+from flask_login import current_user, login_required
+from sqlalchemy import event
+
+logger = logging.getLogger('expense_tracker.instrumentation')
+
+
+def init_instrumentation(app, db, repeated_query_threshold=5, profiler_enabled=False, admin_usernames=()):
+    """Hooks SQLAlchemy and Flask signals so every request logs one JSON line and returns a Server-Timing header."""
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+    @event.listens_for(db.Engine, 'before_cursor_execute')
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(db.Engine, 'after_cursor_execute')
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and conn.info.get('query_started') and 'sql_statements' in g:
+            g.sql_time += time.perf_counter() - conn.info['query_started'].pop()
+            g.sql_statements[statement] += 1
+
+    @event.listens_for(db.session, 'do_orm_execute')
+    def record_relationship_load(orm_execute_state):
+        if has_request_context() and orm_execute_state.is_relationship_load and 'relationship_loads' in g:
+            g.relationship_loads[str(orm_execute_state.loader_strategy_path.path[-1])] += 1
+
+    @before_render_template.connect_via(app)
+    def start_template(sender, template, context, **extra):
+        g.template_started = time.perf_counter()
+
+    @template_rendered.connect_via(app)
+    def end_template(sender, template, context, **extra):
+        if 'template_started' in g:
+            g.template_time += time.perf_counter() - g.pop('template_started')
+
+    @app.before_request
+    def start_request():
+        g.request_started = time.perf_counter()
+        g.sql_time = g.template_time = 0.0
+        g.sql_statements = Counter()
+        g.relationship_loads = Counter()
+
+    @app.after_request
+    def add_server_timing(response):
+        if 'request_started' not in g:
+            return response
+        metrics = [f'sql;dur={g.sql_time * 1000:.1f};desc="{sum(g.sql_statements.values())} queries"', f'app;dur={(time.perf_counter() - g.request_started) * 1000:.1f}']
+        if not response.is_streamed:
+            metrics.insert(1, f'tpl;dur={g.template_time * 1000:.1f}')
+        response.headers['Server-Timing'] = ', '.join(metrics)
+        # Logged on close so streamed templates are included in the timings.
+        response.call_on_close(log_request(request.method, request.path, request.endpoint, response.status_code, g._get_current_object()))
+        return response
+
+    def log_request(method, path, endpoint, status, request_globals):
+        def emit():
+            repeated = [{'statement': statement[:200], 'count': count} for statement, count in request_globals.sql_statements.items() if count >= repeated_query_threshold]
+            logger.info(json.dumps({
+                'event': 'request', 'method': method, 'path': path, 'endpoint': endpoint, 'status': status,
+                'duration_ms': round((time.perf_counter() - request_globals.request_started) * 1000, 2),
+                'sql_count': sum(request_globals.sql_statements.values()), 'sql_ms': round(request_globals.sql_time * 1000, 2),
+                'template_ms': round(request_globals.template_time * 1000, 2),
+                'relationship_loads': dict(request_globals.relationship_loads), 'repeated_queries': repeated,
+            }))
+        return emit
+
+    if profiler_enabled:
+        profiler = SamplingProfiler(app)
+
+        @app.route('/admin/profile')
+        @login_required
+        def admin_profile():
+            if current_user.username not in admin_usernames:
+                abort(403)
+            seconds = min(request.args.get('seconds', default=5, type=float), 60)
+            return Response(profiler.sample(seconds, route=request.args.get('route')), mimetype='text/plain')
+
+
+class SamplingProfiler:
+    """Samples the stacks of threads that are serving requests and returns them in folded format (route;frame;frame count), ready for flamegraph.pl or speedscope."""
+
+    def __init__(self, app, interval=0.005):
+        self.interval = interval
+        self.active_routes = {}
+
+        @app.before_request
+        def track_route():
+            self.active_routes[threading.get_ident()] = request.endpoint or request.path
+
+        @app.teardown_request
+        def untrack_route(exc):
+            self.active_routes.pop(threading.get_ident(), None)
+
+    def sample(self, seconds, route=None):
+        stacks = Counter()
+        me = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                endpoint = self.active_routes.get(thread_id)
+                if thread_id == me or endpoint is None or (route and endpoint != route):
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(f'{frame.f_code.co_filename.rsplit("/", 1)[-1]}:{frame.f_code.co_name}')
+                    frame = frame.f_back
+                stacks[';'.join([endpoint] + frames[::-1])] += 1
+            time.sleep(self.interval)
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
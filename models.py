@@ -15,8 +15,10 @@ class User(UserMixin, db.Model):
     monthly_limit = db.Column(db.Float, default=0)
     saving_goal = db.Column(db.Float, nullable=True)
     expenses = db.relationship('Expense', backref='user', lazy=True, cascade="all, delete-orphan")
-    achievements = db.relationship('Achievement', secondary=user_achievements, lazy='subquery', backref=db.backref('users', lazy=True))
+    expense_rollups = db.relationship('ExpenseRollup', lazy=True, cascade="all, delete-orphan")
+    achievements = db.relationship('Achievement', secondary=user_achievements, lazy='select', backref=db.backref('users', lazy=True))
     recurring_expenses = db.relationship('RecurringExpense', backref='user', lazy=True, cascade="all, delete-orphan")
+    stats = db.relationship('UserStats', uselist=False, lazy=True, cascade="all, delete-orphan")
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -30,6 +32,26 @@ class Expense(db.Model):
     date = db.Column(db.Date)
     description = db.Column(db.String(200))
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    import_hash = db.Column(db.String(40), nullable=True)
+    is_recurring = db.Column(db.Boolean, nullable=False, default=False, server_default=db.text('false'))
+    __table_args__ = (db.Index('ix_expense_user_category_date', 'user_id', 'category', 'date'), db.Index('ix_expense_user_import_hash', 'user_id', 'import_hash'), db.Index('ix_expense_user_date_forecast', 'user_id', 'date', 'category', 'is_recurring', 'amount'))
+
+class ExpenseRollup(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    category = db.Column(db.String(100), nullable=False)
+    total = db.Column(db.Float, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (db.UniqueConstraint('user_id', 'year', 'month', 'category', name='uq_expense_rollup_bucket'),)
+
+class UserStats(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    data_version = db.Column(db.Integer, nullable=False, default=0)
+    expense_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    lifetime_spend = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    recurring_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
 class Achievement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -45,4 +67,6 @@ class RecurringExpense(db.Model):
     description = db.Column(db.String(200), nullable=True)
     frequency = db.Column(db.String(20), nullable=False)
     start_date = db.Column(db.Date, nullable=False)
-    last_processed_date = db.Column(db.Date, nullable=True)
\ No newline at end of file
+    last_processed_date = db.Column(db.Date, nullable=True)
+    next_due_date = db.Column(db.Date, nullable=True, index=True)
+    __table_args__ = (db.Index('ix_recurring_expense_user_next_due', 'user_id', 'next_due_date'),)
\ No newline at end of file
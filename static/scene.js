@@ -1,12 +1,13 @@
-import * as THREE from 'https://cdnjs.cloudflare.com/ajax/libs/three.js/r128/three.module.js';
-import { EffectComposer } from 'https://cdn.skypack.dev/three@0.128.0/examples/jsm/postprocessing/EffectComposer.js';
-import { RenderPass } from 'https://cdn.skypack.dev/three@0.128.0/examples/jsm/postprocessing/RenderPass.js';
-import { UnrealBloomPass } from 'https://cdn.skypack.dev/three@0.128.0/examples/jsm/postprocessing/UnrealBloomPass.js';
+const canvas = document.querySelector('#bg-3d');
+const THREE = await import(canvas.dataset.threeUrl);
+// Reduced-cost mode moves the particle animation into a vertex shader, skips the bloom pass and caps the pixel ratio.
+const reducedCost = canvas.dataset.sceneMode === 'reduced';
+const reducedMotion = window.matchMedia('(prefers-reduced-motion: reduce)');
 
 const scene = new THREE.Scene();
 const camera = new THREE.PerspectiveCamera(75, window.innerWidth / window.innerHeight, 0.1, 1000);
-const renderer = new THREE.WebGLRenderer({ canvas: document.querySelector('#bg-3d'), antialias: true, alpha: true });
-renderer.setPixelRatio(window.devicePixelRatio);
+const renderer = new THREE.WebGLRenderer({ canvas: canvas, antialias: !reducedCost, alpha: true });
+renderer.setPixelRatio(reducedCost ? Math.min(window.devicePixelRatio, 1.5) : window.devicePixelRatio);
 renderer.setSize(window.innerWidth, window.innerHeight);
 camera.position.set(0, 0, 10);
 
@@ -18,6 +19,11 @@ const pointLight = new THREE.PointLight(0xffffff, 0.5);
 pointLight.position.set(-5, -5, 5);
 scene.add(pointLight);
 
+const repelRadius = 7;
+const repelStrength = 0.8;
+const returnStrength = 0.010;
+const damping = 0.5;
+
 const particlesCount = 1200;
 const particlesGeometry = new THREE.BufferGeometry();
 const posArray = new Float32Array(particlesCount * 3);
@@ -27,14 +33,49 @@ for (let i = 0; i < particlesCount; i++) {
     const y = (Math.random() - 0.5) * 30;
     const z = (Math.random() - 0.5) * 30;
     posArray[i * 3] = x; posArray[i * 3 + 1] = y; posArray[i * 3 + 2] = z;
-    particlesData.push({ originalPos: new THREE.Vector3(x, y, z), velocity: new THREE.Vector3(0, 0, 0) });
+    if (!reducedCost) particlesData.push({ originalPos: new THREE.Vector3(x, y, z), velocity: new THREE.Vector3(0, 0, 0) });
 }
 particlesGeometry.setAttribute('position', new THREE.BufferAttribute(posArray, 3));
 const textureLoader = new THREE.TextureLoader();
 const dollarSVG = `<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 32 32"><text x="50%" y="50%" dominant-baseline="middle" text-anchor="middle" font-size="28px" font-weight="bold" fill="white">$</text></svg>`;
 const encodedSVG = window.btoa(dollarSVG);
-const dollarTexture = textureLoader.load('data:image/svg+xml;base64,' + encodedSVG);
-const particlesMaterial = new THREE.PointsMaterial({ size: 0.5, map: dollarTexture, transparent: true, opacity: 0.4, blending: THREE.AdditiveBlending });
+const dollarTexture = textureLoader.load('data:image/svg+xml;base64,' + encodedSVG, () => { if (frame === null) render(); });
+const particlesMaterial = reducedCost ? new THREE.ShaderMaterial({
+    uniforms: {
+        uTexture: { value: dollarTexture },
+        uMouse: { value: new THREE.Vector3() },
+        uTime: { value: 0 },
+        uScale: { value: renderer.domElement.height / 2 },
+        uSize: { value: 0.5 },
+        uOpacity: { value: 0.4 },
+        uRepelRadius: { value: repelRadius },
+    },
+    // Each particle is pushed away from the (eased) mouse position, so the per-frame CPU work is a couple of uniform updates.
+    vertexShader: `
+        uniform vec3 uMouse;
+        uniform float uTime;
+        uniform float uScale;
+        uniform float uSize;
+        uniform float uRepelRadius;
+        void main() {
+            vec3 offset = position - uMouse;
+            float dist = length(offset);
+            vec3 displaced = position + (dist > 0.0 ? offset / dist : vec3(0.0)) * max(uRepelRadius - dist, 0.0) * 0.6;
+            displaced.y += sin(uTime * 0.5 + position.x) * 0.1;
+            vec4 mvPosition = modelViewMatrix * vec4(displaced, 1.0);
+            gl_PointSize = uSize * (uScale / -mvPosition.z);
+            gl_Position = projectionMatrix * mvPosition;
+        }`,
+    fragmentShader: `
+        uniform sampler2D uTexture;
+        uniform float uOpacity;
+        void main() {
+            gl_FragColor = texture2D(uTexture, vec2(gl_PointCoord.x, 1.0 - gl_PointCoord.y)) * vec4(vec3(1.0), uOpacity);
+        }`,
+    transparent: true,
+    depthWrite: false,
+    blending: THREE.AdditiveBlending,
+}) : new THREE.PointsMaterial({ size: 0.5, map: dollarTexture, transparent: true, opacity: 0.4, blending: THREE.AdditiveBlending });
 const particlesMesh = new THREE.Points(particlesGeometry, particlesMaterial);
 scene.add(particlesMesh);
 
@@ -50,26 +91,30 @@ const t_top = new THREE.Mesh(new THREE.BoxGeometry(2, 0.5, 0.5), material); t_to
 logoGroup.add(t_main, t_top);
 scene.add(logoGroup);
 
-const renderScene = new RenderPass(scene, camera);
-const bloomPass = new UnrealBloomPass(new THREE.Vector2(window.innerWidth, window.innerHeight), 1.5, 0.4, 0.85);
-bloomPass.threshold = 0; bloomPass.strength = 1.2; bloomPass.radius = 0.5;
-const composer = new EffectComposer(renderer);
-composer.addPass(renderScene);
-composer.addPass(bloomPass);
+let composer = null;
+if (!reducedCost) {
+    const [{ EffectComposer }, { RenderPass }, { UnrealBloomPass }] = await Promise.all([
+        import('https://cdn.skypack.dev/three@0.128.0/examples/jsm/postprocessing/EffectComposer.js'),
+        import('https://cdn.skypack.dev/three@0.128.0/examples/jsm/postprocessing/RenderPass.js'),
+        import('https://cdn.skypack.dev/three@0.128.0/examples/jsm/postprocessing/UnrealBloomPass.js'),
+    ]);
+    const renderScene = new RenderPass(scene, camera);
+    const bloomPass = new UnrealBloomPass(new THREE.Vector2(window.innerWidth, window.innerHeight), 1.5, 0.4, 0.85);
+    bloomPass.threshold = 0; bloomPass.strength = 1.2; bloomPass.radius = 0.5;
+    composer = new EffectComposer(renderer);
+    composer.addPass(renderScene);
+    composer.addPass(bloomPass);
+}
 
 const mouse = new THREE.Vector2();
 document.addEventListener('mousemove', (event) => { mouse.x = (event.clientX / window.innerWidth) * 2 - 1; mouse.y = -(event.clientY / window.innerHeight) * 2 + 1; });
 
 const clock = new THREE.Clock();
-const repelRadius = 7;
-const repelStrength = 0.8;
-const returnStrength = 0.010;
-const damping = 0.5;
+const mouse3D = new THREE.Vector3();
+let frame = null;
 
-function animate() {
-    const elapsedTime = clock.getElapsedTime();
+function updateParticles() {
     const positions = particlesGeometry.attributes.position.array;
-    const mouse3D = new THREE.Vector3(mouse.x * 10, mouse.y * 5, 0);
     for (let i = 0; i < particlesCount; i++) {
         const i3 = i * 3;
         const particlePos = new THREE.Vector3(positions[i3], positions[i3 + 1], positions[i3 + 2]);
@@ -86,19 +131,48 @@ function animate() {
         positions[i3 + 2] += particlesData[i].velocity.z;
     }
     particlesGeometry.attributes.position.needsUpdate = true;
+}
+
+function render() {
+    if (composer) composer.render(); else renderer.render(scene, camera);
+}
+
+function animate() {
+    const elapsedTime = clock.getElapsedTime();
+    mouse3D.set(mouse.x * 10, mouse.y * 5, 0);
+    if (reducedCost) {
+        particlesMaterial.uniforms.uTime.value = elapsedTime;
+        particlesMaterial.uniforms.uMouse.value.lerp(mouse3D, 0.1);
+    } else {
+        updateParticles();
+    }
 
     const targetX = mouse.x * 1.5;
     const targetY = mouse.y * 1.5;
     logoGroup.rotation.y += 0.05 * (targetX - logoGroup.rotation.y);
     logoGroup.rotation.x += 0.05 * (targetY - logoGroup.rotation.x);
     logoGroup.position.y = Math.sin(elapsedTime * 0.5) * 0.2;
-    composer.render();
-    requestAnimationFrame(animate);
+    render();
+    frame = requestAnimationFrame(animate);
+}
+
+// Animate only while the tab is visible and the user hasn't asked for reduced motion; otherwise keep a still frame.
+function start() {
+    if (frame === null && !document.hidden && !reducedMotion.matches) frame = requestAnimationFrame(animate);
 }
+function stop() {
+    if (frame !== null) { cancelAnimationFrame(frame); frame = null; }
+}
+document.addEventListener('visibilitychange', () => { if (document.hidden) stop(); else start(); });
+reducedMotion.addEventListener('change', () => { if (reducedMotion.matches) stop(); else start(); });
+
 window.addEventListener('resize', () => {
     camera.aspect = window.innerWidth / window.innerHeight;
     camera.updateProjectionMatrix();
     renderer.setSize(window.innerWidth, window.innerHeight);
-    composer.setSize(window.innerWidth, window.innerHeight);
+    if (composer) composer.setSize(window.innerWidth, window.innerHeight);
+    if (reducedCost) particlesMaterial.uniforms.uScale.value = renderer.domElement.height / 2;
+    if (frame === null) render();
 });
-animate();
\ No newline at end of file
+render();
+start();
@@ -0,0 +1,6 @@
+"""Points the app at a throwaway SQLite database before any test module imports it, so tests never touch instance/database.db or DATABASE_URL."""
+import os
+import tempfile
+
+test_database_dir = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(test_database_dir.name, 'test.db')}"
@@ -0,0 +1,37 @@
+"""Drives parallel writer processes against the SQLite test database and checks that no write is rejected, lost or miscounted."""
+import multiprocessing
+
+import pytest
+
+from app import app, db, User, Expense, UserStats, setup_initial_data, rebuild_rollups
+from benchmarks.bench_concurrency import worker
+
+WORKERS = 3
+WRITES = 10
+
+
+@pytest.fixture
+def user_id():
+    with app.app_context():
+        db.create_all()
+        setup_initial_data()
+        user = User(username='bench')
+        user.set_password('bench-password')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        db.engine.dispose()
+    yield user_id
+    with app.app_context():
+        db.drop_all()
+
+
+def test_parallel_writers_keep_counters_and_rollups_consistent(user_id):
+    # Every worker adds expenses to the same month and category, so all of them contend for one rollup bucket and UserStats row.
+    with multiprocessing.get_context('spawn').Pool(WORKERS) as pool:
+        failures = sum(pool.map(worker, [WRITES] * WORKERS))
+    assert failures == 0
+    with app.app_context():
+        assert Expense.query.filter_by(user_id=user_id).count() == WORKERS * WRITES
+        assert db.session.get(UserStats, user_id).expense_count == WORKERS * WRITES
+        assert rebuild_rollups() == 0
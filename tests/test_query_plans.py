@@ -0,0 +1,57 @@
+"""Checks that the dashboard's expense and forecast queries are answered from the composite indexes (SQLite EXPLAIN QUERY PLAN)."""
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app import app, db, User, Expense, filtered_expenses_query, expense_page, forecast_inputs
+
+
+@pytest.fixture(scope='module')
+def user_id():
+    with app.app_context():
+        db.create_all()
+        user = User(username='plans', password_hash='')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all(Expense(user_id=user.id, amount=n, category=['Food', 'Transport'][n % 2], date=date(2026, n % 12 + 1, n % 28 + 1), description=f'e{n}') for n in range(200))
+        db.session.commit()
+        yield user.id
+        db.drop_all()
+
+
+def query_plan(run_queries):
+    """Runs run_queries() and returns the EXPLAIN QUERY PLAN details of the last expense query it issued."""
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM expense' in statement:
+            statements.append((statement, parameters))
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            run_queries()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+        statement, parameters = statements[-1]
+        return [row[-1] for row in db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+
+
+@pytest.mark.parametrize('month, category, cursor, index', [
+    (None, None, None, 'ix_expense_user_date_forecast'),
+    (3, None, None, 'ix_expense_user_date_forecast'),
+    (None, None, '2026-06-15_100', 'ix_expense_user_date_forecast'),
+    (3, 'Food', None, 'ix_expense_user_category_date'),
+    (None, 'Food', '2026-06-15_100', 'ix_expense_user_category_date'),
+])
+def test_expense_page_uses_composite_index(user_id, month, category, cursor, index):
+    plan = query_plan(lambda: expense_page(filtered_expenses_query(user_id, month, category, 2026), cursor=cursor))
+    assert any(f'INDEX {index} ' in detail for detail in plan), plan
+    assert not any(detail.startswith('SCAN expense') for detail in plan), plan
+    # The forecast index has columns between date and the rowid, so ties on date are sorted per date group; a full sort must not happen.
+    assert not any('TEMP B-TREE' in detail and 'RIGHT PART' not in detail for detail in plan), plan
+
+
+def test_forecast_history_uses_covering_index(user_id):
+    plan = query_plan(lambda: forecast_inputs(user_id, date(2026, 6, 15)))
+    assert any('COVERING INDEX ix_expense_user_date_forecast ' in detail for detail in plan), plan
+    assert not any('TEMP B-TREE' in detail for detail in plan), plan
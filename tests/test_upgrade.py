@@ -0,0 +1,49 @@
+"""Checks that `flask upgrade-db` backfills the rollups and user counters of databases created before they existed."""
+from collections import Counter
+from datetime import date
+
+import pytest
+
+from app import app, db, User, Expense, ExpenseRollup, UserStats, rebuild_rollups
+
+
+EXPENSES = [dict(amount=10.0 * (n + 1), category=['Food', 'Housing'][n % 2], date=date(2026, n % 3 + 1, 1), description=f'e{n}') for n in range(12)]
+
+
+@pytest.fixture(params=['without_rollup_tables', 'without_counter_columns'])
+def baseline_user_id(request):
+    """A database with a user and expenses, built either before the rollup tables existed or before UserStats had its counter columns."""
+    with app.app_context():
+        db.create_all()
+        user = User(username='upgrade', password_hash='')
+        db.session.add(user)
+        db.session.flush()
+        db.session.execute(db.insert(Expense), [dict(expense, user_id=user.id) for expense in EXPENSES])
+        db.session.commit()
+        user_id = user.id
+        if request.param == 'without_rollup_tables':
+            ExpenseRollup.__table__.drop(db.engine)
+            UserStats.__table__.drop(db.engine)
+        else:
+            rebuild_rollups()
+            UserStats.__table__.drop(db.engine)
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql('CREATE TABLE user_stats (user_id INTEGER NOT NULL PRIMARY KEY REFERENCES user (id), data_version INTEGER NOT NULL)')
+                conn.exec_driver_sql('INSERT INTO user_stats (user_id, data_version) VALUES (?, 3)', (user_id,))
+    yield user_id
+    with app.app_context():
+        db.drop_all()
+
+
+def test_upgrade_db_backfills_rollups_and_counters(baseline_user_id):
+    result = app.test_cli_runner().invoke(args=['upgrade-db'])
+    assert result.exit_code == 0, result.output
+    assert 'backfilled' in result.output
+    with app.app_context():
+        totals, counts = Counter(), Counter()
+        for expense in EXPENSES:
+            totals[expense['date'].month, expense['category']] += expense['amount']; counts[expense['date'].month, expense['category']] += 1
+        assert {(b.month, b.category): (b.total, b.count) for b in ExpenseRollup.query.filter_by(user_id=baseline_user_id)} == {bucket: (totals[bucket], counts[bucket]) for bucket in totals}
+        stats = db.session.get(UserStats, baseline_user_id)
+        assert (stats.expense_count, stats.lifetime_spend) == (len(EXPENSES), sum(expense['amount'] for expense in EXPENSES))
+    assert 'backfilled' not in app.test_cli_runner().invoke(args=['upgrade-db']).output